@@ -1,22 +1,85 @@
-from flask import Flask, request, jsonify, redirect, url_for, session
+from flask import Flask, request, jsonify, redirect, url_for, session, g
+from flask.json.provider import DefaultJSONProvider
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import MaxRetryError, ReadTimeoutError
 import os
 import json
 from functools import wraps
-from authlib.integrations.flask_client import OAuth
-from urllib.parse import urlencode
+from contextlib import contextmanager
+from urllib.parse import urlencode, quote, urlparse
+from email.utils import parsedate_to_datetime
 import uuid
 from dotenv import load_dotenv
 import secrets
+import hashlib
+import sqlite3
+import tempfile
+import base64
+import itertools
+import zlib
+import bisect
+import atexit
+import unicodedata
+import gzip
+import io
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeout
+
+try:
+    import orjson
+except ImportError:  # Optional fast JSON encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Optional brotli compression
+    brotli = None
 
 load_dotenv()
 
+# JSON provider backed by orjson, used for routes that build responses from
+# Python objects. Falls back to Flask's encoder for anything orjson rejects.
+class OrjsonProvider(DefaultJSONProvider):
+    option = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        try:
+            return orjson.dumps(obj, default=self.default, option=self.option).decode()
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = orjson.dumps(obj, default=self.default, option=self.option)
+        except TypeError:
+            return super().response(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+# "auto" uses orjson when it is installed, "orjson" requires it, "default"
+# keeps Flask's built-in encoder
+JSON_PROVIDER = os.environ.get("JSON_PROVIDER", "auto")
+if JSON_PROVIDER == "orjson" and orjson is None:
+    raise RuntimeError("JSON_PROVIDER=orjson requires the orjson package")
+
 app = Flask(__name__)
+if JSON_PROVIDER in ("auto", "orjson") and orjson is not None:
+    app.json = OrjsonProvider(app)
+
 # Use a secure random key if environment variable is not set
 app.secret_key = os.environ.get("FLASK_SECRET_KEY") or secrets.token_hex(16)
 
-# Google Books API base URLs
-GOOGLE_BOOKS_API_BASE_URL = "https://www.googleapis.com/books/v1"
+# Google Books API base URLs (overridable to point at a local stand-in for load tests)
+GOOGLE_BOOKS_API_BASE_URL = os.environ.get("GOOGLE_BOOKS_API_BASE_URL", "https://www.googleapis.com/books/v1").rstrip("/")
 VOLUMES_ENDPOINT = f"{GOOGLE_BOOKS_API_BASE_URL}/volumes"
 BOOKSHELF_ENDPOINT = f"{GOOGLE_BOOKS_API_BASE_URL}/users"
 MY_LIBRARY_ENDPOINT = f"{GOOGLE_BOOKS_API_BASE_URL}/mylibrary/bookshelves"
@@ -32,10 +95,10 @@ if not API_KEY:
 if not GOOGLE_CLIENT_ID or not GOOGLE_CLIENT_SECRET:
     print("WARNING: Google OAuth credentials not configured. Authentication features will not work.")
 
-# In-memory storage for non-authenticated users (replace with database in production)
-LOCAL_BOOKSHELVES = {
-    # Format: user_id: { shelf_id: { name: "shelf_name", books: [book1, book2, ...] } }
-}
+# Storage backend for non-authenticated users' bookshelves: "sqlite" (shared
+# across processes and restarts) or "memory" (process-local)
+SHELF_STORE_BACKEND = os.environ.get("SHELF_STORE", "sqlite")
+SHELF_DB_PATH = os.environ.get("SHELF_DB_PATH", os.path.join(tempfile.gettempdir(), "bookfinder_shelves.db"))
 
 # Default bookshelves for new users
 DEFAULT_SHELVES = {
@@ -44,23 +107,1278 @@ DEFAULT_SHELVES = {
     "read": {"name": "Read", "books": []}
 }
 
-# OAuth setup
-oauth = OAuth(app)
-
-# Only register Google OAuth if credentials are available
-if GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET:
-    google = oauth.register(
-        name='google',
-        client_id=GOOGLE_CLIENT_ID,
-        client_secret=GOOGLE_CLIENT_SECRET,
-        access_token_url='https://accounts.google.com/o/oauth2/token',
-        access_token_params=None,
-        authorize_url='https://accounts.google.com/o/oauth2/auth',
-        authorize_params=None,
-        api_base_url='https://www.googleapis.com/oauth2/v1/',
-        client_kwargs={'scope': 'https://www.googleapis.com/auth/books'}
+# Metrics. Each thread updates its own shard without locking; shards are only
+# merged when /api/metrics is scraped. Shards of finished threads are folded
+# into a retired shard so thread-per-request servers don't grow the list.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_SLOW_SECONDS = float(os.environ.get("PROFILE_SLOW_SECONDS", 1.0))
+# Python 3.12+ allows one active profiler per process, so sampled requests
+# that overlap one already being profiled are skipped
+PROFILER_LOCK = threading.Lock()
+
+class _MetricsShard:
+    def __init__(self):
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+
+    def merge_into(self, counters, histograms):
+        for key, value in self.counters.copy().items():
+            counters[key] = counters.get(key, 0) + value
+        for key, values in self.histograms.copy().items():
+            merged = histograms.setdefault(key, [0] * len(values))
+            for i, value in enumerate(list(values)):
+                merged[i] += value
+
+class Metrics:
+    def __init__(self):
+        self.buckets = {}
+        self.help = {}
+        self._local = threading.local()
+        self._shards = []  # (thread, shard)
+        self._retired = _MetricsShard()
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help_text, buckets):
+        self.help[name] = ("histogram", help_text)
+        self.buckets[name] = buckets
+
+    def counter(self, name, help_text, kind="counter"):
+        self.help[name] = (kind, help_text)
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _MetricsShard()
+            with self._lock:
+                alive = []
+                for thread, other in self._shards:
+                    if thread.is_alive():
+                        alive.append((thread, other))
+                    else:
+                        other.merge_into(self._retired.counters, self._retired.histograms)
+                alive.append((threading.current_thread(), shard))
+                self._shards = alive
+        return shard
+
+    def inc(self, name, labels=(), value=1):
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        histograms = self._shard().histograms
+        key = (name, labels)
+        buckets = self.buckets[name]
+        values = histograms.get(key)
+        if values is None:
+            values = histograms[key] = [0] * (len(buckets) + 2)
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                values[i] += 1
+                break
+        values[-2] += value
+        values[-1] += 1
+
+    def snapshot(self):
+        counters, histograms = {}, {}
+        with self._lock:
+            shards = [shard for _, shard in self._shards] + [self._retired]
+        for shard in shards:
+            shard.merge_into(counters, histograms)
+        return counters, histograms
+
+    # Prometheus text exposition format; gauges are passed in as
+    # {name: [(labels, value), ...]} since they are read at scrape time
+    def render(self, gauges=None):
+        counters, histograms = self.snapshot()
+        lines = []
+        for name, (kind, help_text) in sorted(self.help.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for (metric, labels), values in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(self.buckets[name], values):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{format_labels(labels + (('le', str(bound)),))} {cumulative}")
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {values[-1]}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {values[-2]}")
+                    lines.append(f"{name}_count{format_labels(labels)} {values[-1]}")
+            elif kind == "gauge" and gauges and name in gauges:
+                for labels, value in gauges[name]:
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+            else:
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), chr(92) + "n")}"'
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+metrics = Metrics()
+metrics.counter("bookfinder_http_requests_total", "API requests by route, method and status")
+metrics.histogram("bookfinder_http_request_duration_seconds", "API request latency by route", LATENCY_BUCKETS)
+metrics.histogram("bookfinder_http_response_bytes", "API response body size by route", SIZE_BUCKETS)
+metrics.counter("bookfinder_http_requests_in_flight", "API requests currently being handled", kind="gauge")
+metrics.counter("bookfinder_upstream_requests_total", "Google Books calls by endpoint and status (timeout/error for failures)")
+metrics.histogram("bookfinder_upstream_request_duration_seconds", "Google Books call latency by endpoint", LATENCY_BUCKETS)
+metrics.counter("bookfinder_upstream_in_flight", "Google Books calls currently in flight", kind="gauge")
+metrics.counter("bookfinder_circuit_open", "1 if the endpoint's circuit breaker is not closed", kind="gauge")
+metrics.counter("bookfinder_cache_requests_total", "Cache lookups by cache and result (hit, miss, stale)")
+metrics.counter("bookfinder_book_index_dropped_total", "Batches not indexed because the book index fell behind")
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    metrics.inc("bookfinder_http_requests_in_flight")
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE and PROFILER_LOCK.acquire(blocking=False):
+        import cProfile  # Only loaded when profiling is enabled
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # Another profiling tool (e.g. a debugger) is active
+            PROFILER_LOCK.release()
+            return
+        g.profiler = profiler
+
+# Registered before the response finalizer, so it runs after it and sees the
+# final (possibly compressed) body size
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.inc("bookfinder_http_requests_total", (("route", route), ("method", request.method), ("status", str(response.status_code))))
+    metrics.observe("bookfinder_http_request_duration_seconds", (("route", route),), elapsed)
+    if not response.is_streamed:
+        metrics.observe("bookfinder_http_response_bytes", (("route", route),), response.calculate_content_length() or 0)
+    
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        PROFILER_LOCK.release()
+        if elapsed >= PROFILE_SLOW_SECONDS:
+            import pstats
+            stats = io.StringIO()
+            pstats.Stats(profiler, stream=stats).sort_stats("cumulative").print_stats(20)
+            app.logger.warning("Slow request %s %s took %.3fs\n%s", request.method, request.full_path, elapsed, stats.getvalue())
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    metrics.inc("bookfinder_http_requests_in_flight", value=-1)
+    # If the response was never recorded, still let the next request profile
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        PROFILER_LOCK.release()
+
+# Upstream HTTP client settings
+UPSTREAM_POOL_CONNECTIONS = int(os.environ.get("UPSTREAM_POOL_CONNECTIONS", 4))
+UPSTREAM_POOL_MAXSIZE = int(os.environ.get("UPSTREAM_POOL_MAXSIZE", 32))
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get("UPSTREAM_CONNECT_TIMEOUT", 3.05))
+UPSTREAM_READ_TIMEOUT = float(os.environ.get("UPSTREAM_READ_TIMEOUT", 10))
+UPSTREAM_RETRIES = int(os.environ.get("UPSTREAM_RETRIES", 2))
+UPSTREAM_RETRY_BACKOFF = float(os.environ.get("UPSTREAM_RETRY_BACKOFF", 0.3))
+UPSTREAM_TIMEOUT = (UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT)
+
+# Shared session so connections to the Google Books API are kept alive and reused
+# instead of paying a TCP+TLS handshake on every proxied request. The
+# adapter only retries failed connections, which never reach Google; read
+# timeouts are not retried, so a hanging upstream holds a worker for one
+# UPSTREAM_READ_TIMEOUT. Retries of 429/5xx responses spend quota, so they
+# go through the scheduler in upstream_request instead.
+def create_upstream_session():
+    retry = Retry(
+        total=UPSTREAM_RETRIES,
+        connect=UPSTREAM_RETRIES,
+        read=False,
+        status=0,
+        backoff_factor=UPSTREAM_RETRY_BACKOFF,
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+        respect_retry_after_header=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=UPSTREAM_POOL_CONNECTIONS,
+        pool_maxsize=UPSTREAM_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+upstream = create_upstream_session()
+
+# Coalesces identical concurrent calls: the first caller for a key runs the
+# call and every caller that arrives while it is in flight waits for and
+# shares its result (or exception).
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+upstream_flights = SingleFlight()
+
+# Tracks how busy and how healthy the upstream currently looks, so optional
+# background work can back off before it competes with user traffic
+UPSTREAM_PRESSURE_WINDOW = float(os.environ.get("UPSTREAM_PRESSURE_WINDOW", 30))
+
+class UpstreamPressure:
+    def __init__(self):
+        self.in_flight = 0
+        self.last_error_at = None
+        self._lock = threading.Lock()
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, status_code=None):
+        with self._lock:
+            self.in_flight -= 1
+            if status_code is None or status_code == 429 or status_code >= 500:
+                self.last_error_at = time.monotonic()
+
+    def recently_failed(self):
+        last_error_at = self.last_error_at
+        return last_error_at is not None and time.monotonic() - last_error_at < UPSTREAM_PRESSURE_WINDOW
+
+upstream_pressure = UpstreamPressure()
+
+# Upstream quota scheduling. All traffic shares the API key's quota, so calls
+# take a token from a per-key bucket in priority order. Lower priorities must
+# leave a reserve in the bucket and give up sooner, so they are shed before
+# user writes or detail views start waiting.
+UPSTREAM_RATE = float(os.environ.get("UPSTREAM_RATE", 20))  # Tokens per second; 0 disables
+UPSTREAM_BURST = int(os.environ.get("UPSTREAM_BURST", 40))
+UPSTREAM_BACKOFF_BASE = float(os.environ.get("UPSTREAM_BACKOFF_BASE", 0.5))
+UPSTREAM_BACKOFF_MAX = float(os.environ.get("UPSTREAM_BACKOFF_MAX", 60))
+
+PRIORITY_WRITE, PRIORITY_DETAIL, PRIORITY_SEARCH, PRIORITY_PREFETCH = range(4)
+# Fraction of the bucket each priority must leave untouched
+PRIORITY_RESERVE = {PRIORITY_WRITE: 0.0, PRIORITY_DETAIL: 0.1, PRIORITY_SEARCH: 0.25, PRIORITY_PREFETCH: 0.5}
+# Longest a call of each priority may wait for a token before being shed
+PRIORITY_MAX_WAIT = {PRIORITY_WRITE: 10.0, PRIORITY_DETAIL: 5.0, PRIORITY_SEARCH: 2.0, PRIORITY_PREFETCH: 0.0}
+
+# Raised instead of calling the upstream when it should not be called right now
+class UpstreamUnavailable(Exception):
+    message = "Google Books API is temporarily unavailable"
+
+    def __init__(self, retry_after):
+        super().__init__(self.message)
+        self.retry_after = retry_after
+
+class UpstreamThrottled(UpstreamUnavailable):
+    message = "Upstream quota exhausted, please retry later"
+
+class CircuitOpen(UpstreamUnavailable):
+    message = "Google Books API is temporarily unavailable, please retry later"
+
+# Seconds to wait according to a Retry-After header (delta-seconds or HTTP date)
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class UpstreamScheduler:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._buckets = {}  # quota key -> [tokens, last refill]
+        self._waiting = [0] * len(PRIORITY_RESERVE)
+        self._paused_until = 0.0
+        self._backoff = UPSTREAM_BACKOFF_BASE
+        self._cond = threading.Condition()
+
+    def _bucket(self, quota_key, now):
+        bucket = self._buckets.get(quota_key)
+        if bucket is None:
+            bucket = self._buckets[quota_key] = [float(self.capacity), now]
+        bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        return bucket
+
+    def paused(self):
+        return time.monotonic() < self._paused_until
+
+    def retry_after(self):
+        return max(1, int(self._paused_until - time.monotonic() + 0.999))
+
+    def acquire(self, priority, quota_key=None, deadline=None):
+        if self.rate <= 0:
+            return
+        if deadline is None:
+            deadline = time.monotonic() + PRIORITY_MAX_WAIT[priority]
+        reserve = PRIORITY_RESERVE[priority] * self.capacity
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    bucket = self._bucket(quota_key, now)
+                    blocked = any(self._waiting[p] for p in range(priority))
+                    if now >= self._paused_until and not blocked and bucket[0] - 1 >= reserve:
+                        bucket[0] -= 1
+                        return
+                    wake = max(self._paused_until - now, (1 + reserve - bucket[0]) / self.rate, 0.005)
+                    if now + wake > deadline and not blocked:
+                        raise UpstreamThrottled(max(1, int(wake + 0.999)))
+                    if now >= deadline:
+                        raise UpstreamThrottled(max(1, int(wake + 0.999)))
+                    self._cond.wait(min(wake, deadline - now))
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    # Pause all upstream traffic after a 429 or 5xx, honoring Retry-After and
+    # otherwise backing off exponentially; any success resets the backoff
+    def record(self, status_code, headers=None):
+        with self._cond:
+            if status_code == 429 or status_code >= 500:
+                delay = parse_retry_after((headers or {}).get("Retry-After"))
+                if delay is None:
+                    delay = self._backoff
+                    self._backoff = min(self._backoff * 2, UPSTREAM_BACKOFF_MAX)
+                self._paused_until = max(self._paused_until, time.monotonic() + min(delay, UPSTREAM_BACKOFF_MAX))
+            else:
+                self._backoff = UPSTREAM_BACKOFF_BASE
+            self._cond.notify_all()
+
+upstream_scheduler = UpstreamScheduler(UPSTREAM_RATE, UPSTREAM_BURST)
+
+# Circuit breaker settings. A breaker trips when, over its last
+# BREAKER_WINDOW calls, the share of failures or of calls slower than
+# BREAKER_SLOW_CALL_SECONDS reaches the threshold.
+BREAKER_WINDOW = int(os.environ.get("BREAKER_WINDOW", 20))
+BREAKER_MIN_CALLS = int(os.environ.get("BREAKER_MIN_CALLS", 10))
+BREAKER_ERROR_RATE = float(os.environ.get("BREAKER_ERROR_RATE", 0.5))
+BREAKER_SLOW_CALL_SECONDS = float(os.environ.get("BREAKER_SLOW_CALL_SECONDS", 5))
+BREAKER_SLOW_RATE = float(os.environ.get("BREAKER_SLOW_RATE", 0.8))
+BREAKER_OPEN_SECONDS = float(os.environ.get("BREAKER_OPEN_SECONDS", 30))
+
+# Closed: calls flow and outcomes are recorded. Open: calls fail fast until
+# BREAKER_OPEN_SECONDS pass. Half-open: a single probe call decides whether
+# to close again or re-open.
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, name):
+        self.name = name
+        self.state = self.CLOSED
+        self._outcomes = deque(maxlen=BREAKER_WINDOW)  # (failed, slow)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < BREAKER_OPEN_SECONDS:
+                    raise CircuitOpen(self._retry_after())
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpen(1)
+                self._probing = True
+
+    # Give back a half-open probe slot for a call that never reached upstream
+    def release(self):
+        with self._lock:
+            self._probing = False
+
+    def record(self, failed, elapsed):
+        slow = elapsed >= BREAKER_SLOW_CALL_SECONDS
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if failed or slow:
+                    self._open()
+                else:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append((failed, slow))
+            calls = len(self._outcomes)
+            if calls < BREAKER_MIN_CALLS:
+                return
+            failures = sum(1 for failed, _ in self._outcomes if failed)
+            slow_calls = sum(1 for _, slow in self._outcomes if slow)
+            if failures / calls >= BREAKER_ERROR_RATE or slow_calls / calls >= BREAKER_SLOW_RATE:
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def _retry_after(self):
+        return max(1, int(BREAKER_OPEN_SECONDS - (time.monotonic() - self._opened_at) + 0.999))
+
+# One breaker per upstream endpoint family, so a failing search backend does
+# not stop volume lookups
+UPSTREAM_BREAKERS = {name: CircuitBreaker(name) for name in ("search", "volume", "bookshelves", "mylibrary", "other")}
+
+def upstream_endpoint(url):
+    path = urlparse(url).path
+    if path.startswith(urlparse(MY_LIBRARY_ENDPOINT).path):
+        return "mylibrary"
+    if path.startswith(urlparse(BOOKSHELF_ENDPOINT).path):
+        return "bookshelves"
+    volumes_path = urlparse(VOLUMES_ENDPOINT).path
+    if path == volumes_path:
+        return "search"
+    if path.startswith(volumes_path + "/"):
+        return "volume"
+    return "other"
+
+# Responses to idempotent GETs that are retried
+UPSTREAM_RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+# Send an upstream request, retrying GETs that got a 429 or 5xx. Every
+# attempt takes its own scheduler token and waits out the pause the failure
+# set (Retry-After or exponential backoff). All attempts share the
+# priority's wait budget; once it runs out, or the breaker opens, the last
+# response is returned rather than an error. Without the scheduler
+# (UPSTREAM_RATE=0) only 5xx responses are retried, after a short backoff.
+def upstream_request(method, url, priority, **kwargs):
+    attempts = UPSTREAM_RETRIES + 1 if method == "GET" else 1
+    deadline = time.monotonic() + PRIORITY_MAX_WAIT[priority]
+    response = None
+    for attempt in range(attempts):
+        if response is not None:
+            if upstream_scheduler.rate <= 0:
+                if response.status_code == 429:
+                    break
+                time.sleep(UPSTREAM_RETRY_BACKOFF * 2 ** (attempt - 1))
+            response.close()
+        try:
+            latest = upstream_attempt(method, url, priority, deadline, **kwargs)
+        except UpstreamUnavailable:
+            if response is None:
+                raise
+            break
+        response = latest
+        if response.status_code not in UPSTREAM_RETRY_STATUSES:
+            break
+    return response
+
+# Send one upstream request through the circuit breaker and quota scheduler
+def upstream_attempt(method, url, priority, deadline=None, **kwargs):
+    breaker = UPSTREAM_BREAKERS[upstream_endpoint(url)]
+    breaker.allow()
+    try:
+        upstream_scheduler.acquire(priority, API_KEY, deadline)
+    except UpstreamThrottled:
+        breaker.release()
+        raise
+    upstream_pressure.started()
+    endpoint = upstream_endpoint(url)
+    status_code = None
+    outcome = "error"
+    started = time.monotonic()
+    try:
+        response = upstream.request(method, url, timeout=UPSTREAM_TIMEOUT, **kwargs)
+        response.content  # Read the body before handing it to other waiters
+        status_code = response.status_code
+        outcome = str(status_code)
+    except requests.exceptions.Timeout:
+        outcome = "timeout"
+        raise
+    except requests.exceptions.ConnectionError as e:
+        # A read timeout after exhausted retries arrives wrapped in MaxRetryError
+        reason = e.args[0] if e.args else None
+        if isinstance(reason, MaxRetryError) and isinstance(reason.reason, ReadTimeoutError):
+            outcome = "timeout"
+            raise requests.exceptions.ReadTimeout(reason, request=e.request) from e
+        raise
+    finally:
+        elapsed = time.monotonic() - started
+        upstream_pressure.finished(status_code)
+        breaker.record(status_code is None or status_code >= 500, elapsed)
+        metrics.inc("bookfinder_upstream_requests_total", (("endpoint", endpoint), ("status", outcome)))
+        metrics.observe("bookfinder_upstream_request_duration_seconds", (("endpoint", endpoint),), elapsed)
+    upstream_latency.record(endpoint, elapsed)
+    upstream_scheduler.record(status_code, response.headers)
+    return response
+
+# Hedged requests (opt-in). If an idempotent GET to a hedged endpoint has not
+# answered within that endpoint's recent HEDGE_PERCENTILE latency, a second
+# attempt is sent at prefetch priority and the first success wins.
+UPSTREAM_HEDGING = os.environ.get("UPSTREAM_HEDGING", "false").lower() == "true"
+HEDGE_ENDPOINTS = ("search", "volume")
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", 0.95))
+HEDGE_MIN_DELAY = float(os.environ.get("HEDGE_MIN_DELAY", 0.05))
+HEDGE_DEFAULT_DELAY = float(os.environ.get("HEDGE_DEFAULT_DELAY", 1.0))
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", 20))
+# Hedges may add at most this fraction of extra upstream calls
+HEDGE_BUDGET_RATIO = float(os.environ.get("HEDGE_BUDGET_RATIO", 0.05))
+HEDGE_WORKERS = int(os.environ.get("HEDGE_WORKERS", 32))  # Concurrent hedge attempts
+
+# Recent upstream latencies per endpoint, with percentiles recomputed every
+# few samples rather than on every lookup
+class LatencyTracker:
+    def __init__(self, size=256, refresh_every=16):
+        self.size = size
+        self.refresh_every = refresh_every
+        self._samples = {}
+        self._since_refresh = {}
+        self._sorted = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, elapsed):
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.size)
+            samples.append(elapsed)
+            self._since_refresh[endpoint] = self._since_refresh.get(endpoint, 0) + 1
+            if self._since_refresh[endpoint] >= self.refresh_every:
+                self._since_refresh[endpoint] = 0
+                self._sorted[endpoint] = sorted(samples)
+
+    def percentile(self, endpoint, fraction, min_samples=1):
+        ordered = self._sorted.get(endpoint)
+        if not ordered or len(ordered) < min_samples:
+            return None
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+upstream_latency = LatencyTracker()
+
+# Every primary request earns HEDGE_BUDGET_RATIO of a credit and every hedge
+# spends one, so hedges can never exceed that share of upstream traffic
+class HedgeBudget:
+    def __init__(self, ratio, max_credit=10.0):
+        self.ratio = ratio
+        self.max_credit = max_credit
+        self._credit = 0.0
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._credit = min(self.max_credit, self._credit + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self._credit < 1:
+                return False
+            self._credit -= 1
+            return True
+
+hedge_budget = HedgeBudget(HEDGE_BUDGET_RATIO)
+HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+
+def hedge_delay(endpoint):
+    delay = upstream_latency.percentile(endpoint, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES)
+    return max(HEDGE_MIN_DELAY, delay if delay is not None else HEDGE_DEFAULT_DELAY)
+
+# A blocking requests call can't be interrupted, so the losing attempt is
+# abandoned: it finishes in the background and its response is released
+def _discard_attempt(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+def _run_attempt(future, url, priority, headers):
+    try:
+        future.set_result(upstream_request("GET", url, priority, headers=headers))
+    except Exception as e:
+        future.set_exception(e)
+
+def hedged_get(url, headers, priority):
+    endpoint = upstream_endpoint(url)
+    if not UPSTREAM_HEDGING or endpoint not in HEDGE_ENDPOINTS:
+        return upstream_request("GET", url, priority, headers=headers)
+    
+    hedge_budget.deposit()
+    # The primary gets its own thread rather than a pool slot, so hedging
+    # never caps concurrent upstream calls and time spent queued for a
+    # worker can't count against the hedge delay. Only hedges use the pool.
+    primary = Future()
+    primary.set_running_or_notify_cancel()
+    threading.Thread(
+        target=_run_attempt, args=(primary, url, priority, headers), name="hedge-primary", daemon=True
+    ).start()
+    try:
+        return primary.result(timeout=hedge_delay(endpoint))
+    except FuturesTimeout:
+        pass
+    if not hedge_budget.withdraw():
+        return primary.result()
+    
+    hedge = HEDGE_EXECUTOR.submit(upstream_request, "GET", url, PRIORITY_PREFETCH, headers=headers)
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for loser in pending:
+                    loser.add_done_callback(_discard_attempt)
+                return future.result()
+    # Both attempts failed; report the primary's error
+    return primary.result()
+
+# GET an upstream URL, sharing the call with identical in-flight requests.
+# The auth scope is part of the key so users never share authorized data.
+def upstream_get(url, headers=None, priority=PRIORITY_DETAIL):
+    auth = (headers or {}).get("Authorization")
+    scope = hashlib.sha256(auth.encode()).hexdigest() if auth else None
+    return upstream_flights.do(("GET", url, scope), lambda: hedged_get(url, headers, priority))
+
+# A SQLite file shared by every worker process on the host, in WAL mode so
+# readers never block each other
+class SQLiteDatabase:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    # One connection per thread, in autocommit mode; writes open their own
+    # transactions through _write()
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    # BEGIN IMMEDIATE takes the write lock up front, so concurrent writers
+    # from other processes wait on busy_timeout instead of failing mid-way
+    @contextmanager
+    def _write(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+# Server-side response cache settings (TTLs in seconds)
+SEARCH_CACHE_TTL = int(os.environ.get("SEARCH_CACHE_TTL", 300))
+VOLUME_CACHE_TTL = int(os.environ.get("VOLUME_CACHE_TTL", 3600))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 2048))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# How long past its TTL a response may still be served when Google is failing
+RESPONSE_CACHE_STALE_TTL = int(os.environ.get("RESPONSE_CACHE_STALE_TTL", 86400))
+# "memory" keeps the cache per process; "sqlite" shares it between all worker
+# processes on the host through RESPONSE_CACHE_DB_PATH, with a small
+# per-process cache in front of it
+RESPONSE_CACHE_BACKEND = os.environ.get("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_DB_PATH = os.environ.get(
+    "RESPONSE_CACHE_DB_PATH", os.path.join(tempfile.gettempdir(), "bookfinder_cache.db")
+)
+RESPONSE_CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_LOCAL_MAX_ENTRIES", 256))
+
+# Bounded LRU cache for upstream responses. Entries are evicted when either
+# the entry limit or the byte budget is exceeded, least recently used first.
+class ResponseCache:
+    def __init__(self, max_entries, max_bytes, stale_ttl=0, name=None):
+        self.name = name  # Label for cache metrics; unnamed caches aren't reported
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Expired entries are kept this much longer for get_stale()
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self._get(key)
+        if self.name:
+            metrics.inc("bookfinder_cache_requests_total", (("cache", self.name), ("result", "miss" if value is None else "hit")))
+        return value
+
+    def _get(self, key):
+        entry = self.lookup(key)
+        return entry[0] if entry else None
+
+    # Returns (value, seconds until expiry) for a fresh entry, or None
+    def lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, value = entry
+            now = time.monotonic()
+            if expires_at <= now:
+                if expires_at + self.stale_ttl <= now:
+                    del self._entries[key]
+                    self._bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return value, expires_at - now
+
+    # Returns (value, seconds past expiry) even for an expired entry still
+    # inside the stale window, or None
+    def get_stale(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, _, value = entry
+            now = time.monotonic()
+            if now >= expires_at + self.stale_ttl:
+                return None
+        if self.name:
+            metrics.inc("bookfinder_cache_requests_total", (("cache", self.name), ("result", "stale")))
+        return value, max(0.0, now - expires_at)
+
+    def set(self, key, value, ttl, size):
+        # Never cache something that could not fit on its own
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # Unexpired entries as (key, value, seconds until expiry), least recently
+    # used first, for warm-state snapshots
+    def fresh_entries(self):
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._entries.items())
+        return [(key, value, expires_at - now) for key, (expires_at, _, value) in entries if expires_at > now]
+
+    def __len__(self):
+        return len(self._entries)
+
+# A cached JSON body together with its strong ETag, hashed once when stored.
+# stale_age is set (in seconds past expiry) when an expired copy is served
+# because the upstream failed.
+CachedBody = namedtuple("CachedBody", ["body", "etag", "stale_age"], defaults=(None,))
+
+# The response cache kept in a SQLite file so every worker process on the host
+# shares it. Same interface and eviction rules as ResponseCache, for
+# CachedBody values. Keys are stored as JSON. Writes and recency updates are
+# queued and committed in batches by a single writer thread, so requests
+# never wait on another process holding the write lock; recency is only
+# refreshed once per TOUCH_INTERVAL.
+class SQLiteResponseCache(SQLiteDatabase):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS response_cache (
+            key TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            etag TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS response_cache_accessed_at ON response_cache (accessed_at);
+        CREATE INDEX IF NOT EXISTS response_cache_expires_at ON response_cache (expires_at);
+    """
+
+    TOUCH_INTERVAL = 10
+
+    def __init__(self, path, max_entries, max_bytes, stale_ttl=0, name=None):
+        super().__init__(path)
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self._connection().executescript(self.SCHEMA)
+        self._pending = OrderedDict()  # json key -> row to insert, or None to touch
+        self._pending_lock = threading.Lock()
+        self._flush_scheduled = False
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-writer")
+
+    def _queue(self, key, row):
+        with self._pending_lock:
+            if row is None and self._pending.get(key) is not None:
+                return  # A queued insert already refreshes recency
+            self._pending[key] = row
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self._writer.submit(self._flush)
+
+    def _flush(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, OrderedDict()
+            self._flush_scheduled = False
+        now = time.time()
+        try:
+            with self._write() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO response_cache (key, body, etag, size, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(key,) + row for key, row in pending.items() if row is not None],
+                )
+                conn.executemany(
+                    "UPDATE response_cache SET accessed_at = ? WHERE key = ?",
+                    [(now, key) for key, row in pending.items() if row is None],
+                )
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            # The cache is best effort; a dropped batch only costs upstream calls
+            app.logger.warning("Shared cache write failed: %s", e)
+
+    def _row(self, key):
+        return self._connection().execute(
+            "SELECT body, etag, expires_at, accessed_at FROM response_cache WHERE key = ?",
+            (json.dumps(key),),
+        ).fetchone()
+
+    def get(self, key):
+        entry = self.lookup(key)
+        if self.name:
+            metrics.inc("bookfinder_cache_requests_total", (("cache", self.name), ("result", "miss" if entry is None else "hit")))
+        return entry[0] if entry else None
+
+    def lookup(self, key):
+        row = self._row(key)
+        if row is None:
+            return None
+        body, etag, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at <= now:
+            return None
+        if now - accessed_at >= self.TOUCH_INTERVAL:
+            self._queue(json.dumps(key), None)
+        return CachedBody(body, etag), expires_at - now
+
+    def get_stale(self, key):
+        row = self._row(key)
+        if row is None:
+            return None
+        body, etag, expires_at, _ = row
+        now = time.time()
+        if now >= expires_at + self.stale_ttl:
+            return None
+        if self.name:
+            metrics.inc("bookfinder_cache_requests_total", (("cache", self.name), ("result", "stale")))
+        return CachedBody(body, etag), max(0.0, now - expires_at)
+
+    def set(self, key, value, ttl, size):
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        now = time.time()
+        self._queue(json.dumps(key), (value.body, value.etag, size, now + ttl, now))
+
+    # Drop entries past their stale window, then least recently used entries
+    # until both limits hold
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now - self.stale_ttl,))
+        count, total = conn.execute("SELECT count(*), total(size) FROM response_cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM response_cache ORDER BY accessed_at"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            victims.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM response_cache WHERE key = ?", victims)
+
+    def delete(self, key):
+        key = json.dumps(key)
+        with self._pending_lock:
+            self._pending.pop(key, None)
+        self._connection().execute("DELETE FROM response_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._pending_lock:
+            self._pending.clear()
+        self._connection().execute("DELETE FROM response_cache")
+
+    def __len__(self):
+        return self._connection().execute("SELECT count(*) FROM response_cache").fetchone()[0]
+
+# A per-process cache in front of a shared one. Shared hits are copied into
+# the local tier for the rest of their TTL; writes and deletes go to both.
+class TieredCache:
+    def __init__(self, local, shared):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        entry = self.shared.lookup(key)
+        if self.shared.name:
+            metrics.inc("bookfinder_cache_requests_total", (("cache", self.shared.name), ("result", "miss" if entry is None else "hit")))
+        if entry is None:
+            return None
+        value, expires_in = entry
+        self.local.set(key, value, expires_in, len(value.body))
+        return value
+
+    def lookup(self, key):
+        return self.local.lookup(key) or self.shared.lookup(key)
+
+    def get_stale(self, key):
+        return self.local.get_stale(key) or self.shared.get_stale(key)
+
+    def set(self, key, value, ttl, size):
+        self.local.set(key, value, ttl, size)
+        self.shared.set(key, value, ttl, size)
+
+    def delete(self, key):
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def __len__(self):
+        return len(self.shared)
+
+def create_response_cache():
+    if RESPONSE_CACHE_BACKEND == "sqlite":
+        return TieredCache(
+            ResponseCache(
+                RESPONSE_CACHE_LOCAL_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES // 8, RESPONSE_CACHE_STALE_TTL,
+                name="response_local",
+            ),
+            SQLiteResponseCache(
+                RESPONSE_CACHE_DB_PATH, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES,
+                RESPONSE_CACHE_STALE_TTL, name="response_shared",
+            ),
+        )
+    return ResponseCache(
+        RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_STALE_TTL, name="response"
     )
 
+RESPONSE_CACHE = create_response_cache()
+
+# Optional warm-state snapshot of the in-process response cache, so a new
+# instance starts with the last one's hot entries instead of empty. Written
+# every WARM_STATE_INTERVAL seconds and at exit; loaded on a background
+# thread, skipping anything that expired in between. The shared SQLite
+# backend already persists, so this only applies to "memory".
+WARM_STATE_PATH = os.environ.get("WARM_STATE_PATH") or None
+WARM_STATE_INTERVAL = int(os.environ.get("WARM_STATE_INTERVAL", 300))
+WARM_STATE_LOCK = threading.Lock()
+warm_state_pid = None  # Process whose cache the warm-state thread serves
+
+def cache_key_from_json(value):
+    return tuple(cache_key_from_json(item) for item in value) if isinstance(value, list) else value
+
+def save_warm_state():
+    # Only the process that loaded the state saves it; an idle preloading
+    # master would otherwise overwrite its workers' snapshot with nothing
+    if warm_state_pid != os.getpid():
+        return
+    entries = [
+        [key, base64.b64encode(value.body).decode(), value.etag, time.time() + expires_in]
+        for key, value, expires_in in RESPONSE_CACHE.fresh_entries()
+    ]
+    directory = os.path.dirname(os.path.abspath(WARM_STATE_PATH))
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".warm-state-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(zlib.compress(app.json.dumps(entries).encode()))
+        os.replace(temp_path, WARM_STATE_PATH)
+    except OSError as e:
+        app.logger.warning("Could not write warm state: %s", e)
+
+def load_warm_state():
+    try:
+        with open(WARM_STATE_PATH, "rb") as f:
+            entries = app.json.loads(zlib.decompress(f.read()))
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError, zlib.error) as e:
+        app.logger.warning("Could not load warm state: %s", e)
+        return
+    now = time.time()
+    for key, body, etag, expires_at in entries:
+        if expires_at > now:
+            body = base64.b64decode(body)
+            RESPONSE_CACHE.set(cache_key_from_json(key), CachedBody(body, etag), expires_at - now, len(body))
+
+def warm_state_worker():
+    load_warm_state()
+    while True:
+        time.sleep(WARM_STATE_INTERVAL)
+        save_warm_state()
+
+# Started on the first request in each process rather than at import, so
+# workers forked from a preloading server (gunicorn --preload) get their own
+def start_warm_state():
+    global warm_state_pid
+    if warm_state_pid == os.getpid():
+        return
+    with WARM_STATE_LOCK:
+        if warm_state_pid == os.getpid():
+            return
+        warm_state_pid = os.getpid()
+    threading.Thread(target=warm_state_worker, name="warm-state", daemon=True).start()
+
+if WARM_STATE_PATH and isinstance(RESPONSE_CACHE, ResponseCache):
+    app.before_request(start_warm_state)
+    atexit.register(save_warm_state)
+
+def make_etag(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+def cache_body(cache_key, body, ttl):
+    cached = CachedBody(body, make_etag(body))
+    RESPONSE_CACHE.set(cache_key, cached, ttl, len(body))
+    return cached
+
+# Serve the last known good response for an upstream failure if we have one
+def stale_or_error(cache_key, error, status_code):
+    if status_code == 429 or status_code >= 500:
+        stale = RESPONSE_CACHE.get_stale(cache_key)
+        if stale is not None:
+            cached, age = stale
+            return cached._replace(stale_age=age), 200
+    return error, status_code
+
+# Build a cache key from the upstream params. The API key is left out so the
+# key does not change when credentials are rotated.
+def make_cache_key(kind, params):
+    normalized = []
+    for name, value in sorted(params.items()):
+        if name == "key":
+            continue
+        value = " ".join(str(value).split())
+        normalized.append((name, value))
+    return (kind, tuple(normalized))
+
+# Search result field projection. Named presets expand to dotted field paths
+# within each item; "card" covers what the results grid renders.
+SEARCH_FIELD_PRESETS = {
+    "card": [
+        "id",
+        "volumeInfo.title",
+        "volumeInfo.authors",
+        "volumeInfo.imageLinks",
+        "volumeInfo.description",
+        "volumeInfo.publishedDate",
+    ],
+}
+SEARCH_ENVELOPE_FIELDS = ("kind", "totalItems")
+# When enabled, projections are sent to Google as its own "fields" parameter so
+# the upstream payload shrinks too; otherwise results are trimmed locally
+SEARCH_UPSTREAM_FIELDS = os.environ.get("SEARCH_UPSTREAM_FIELDS", "true").lower() != "false"
+FIELD_PATH_PATTERN = re.compile(r"^[A-Za-z0-9_]+(\.[A-Za-z0-9_]+)*$")
+
+# Parse a "fields" value (preset name or comma-separated dotted paths) into a
+# nested tree, e.g. {"id": {}, "volumeInfo": {"title": {}}}
+def parse_field_tree(value):
+    paths = SEARCH_FIELD_PRESETS.get(value)
+    if paths is None:
+        paths = [path.strip() for path in value.split(",") if path.strip()]
+    if not paths:
+        raise ValueError("fields must name at least one field")
+    tree = {}
+    for path in paths:
+        if not FIELD_PATH_PATTERN.match(path):
+            raise ValueError(f"Invalid field path: {path}")
+        node = tree
+        for part in path.split("."):
+            node = node.setdefault(part, {})
+    return tree
+
+# Field tree for a search response: the projection applies to each item and
+# the envelope fields are always kept
+def search_field_tree(value):
+    field_tree = {"items": parse_field_tree(value)}
+    for name in SEARCH_ENVELOPE_FIELDS:
+        field_tree[name] = {}
+    return field_tree
+
+# Render a field tree in Google's partial response syntax: a,b(c,d)
+def google_fields_selector(tree):
+    parts = []
+    for name, children in sorted(tree.items()):
+        parts.append(f"{name}({google_fields_selector(children)})" if children else name)
+    return ",".join(parts)
+
+# Keep only the fields in the tree; lists are projected element-wise
+def project_fields(value, tree):
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [project_fields(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {name: project_fields(value[name], children) for name, children in tree.items() if name in value}
+
+# Response compression. Brotli is used when the optional brotli package is
+# installed and the client accepts it; gzip otherwise.
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 5))
+COMPRESSION_ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+# Compressed bodies keyed by ETag, so hot payloads are compressed once
+COMPRESSED_CACHE_TTL = max(SEARCH_CACHE_TTL, VOLUME_CACHE_TTL)
+COMPRESSED_CACHE = ResponseCache(
+    int(os.environ.get("COMPRESSED_CACHE_MAX_ENTRIES", 1024)),
+    int(os.environ.get("COMPRESSED_CACHE_MAX_BYTES", 16 * 1024 * 1024)),
+    name="compressed",
+)
+
+# Batch volume lookup settings
+BATCH_MAX_IDS = int(os.environ.get("BATCH_MAX_IDS", 40))
+BATCH_TIMEOUT = float(os.environ.get("BATCH_TIMEOUT", 8))
+
+# Per-user My Library cache settings
+LIBRARY_CACHE_TTL = int(os.environ.get("LIBRARY_CACHE_TTL", 300))
+LIBRARY_CACHE_MAX_ENTRIES = int(os.environ.get("LIBRARY_CACHE_MAX_ENTRIES", 1024))
+LIBRARY_CACHE_MAX_BYTES = int(os.environ.get("LIBRARY_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+# "sqlite" shares the cache between worker processes through
+# LIBRARY_CACHE_DB_PATH, so a write handled by one worker is seen by the
+# others; "memory" is only safe with a single process; "off" disables it.
+# "auto" follows RESPONSE_CACHE_BACKEND, using "sqlite" when the response
+# cache is shared and "off" otherwise.
+LIBRARY_CACHE_BACKEND = os.environ.get("LIBRARY_CACHE_BACKEND", "auto")
+LIBRARY_CACHE_DB_PATH = os.environ.get(
+    "LIBRARY_CACHE_DB_PATH", os.path.join(tempfile.gettempdir(), "bookfinder_library_cache.db")
+)
+
+# Local book index for /api/books/suggest and offline search fallback (opt-in:
+# indexing re-parses upstream bodies that are otherwise passed through).
+# Snapshots are only written when BOOK_INDEX_SNAPSHOT_PATH is set.
+BOOK_INDEX_ENABLED = os.environ.get("BOOK_INDEX", "false").lower() == "true"
+# Fraction of upstream search/volume bodies indexed; shelf adds always are
+BOOK_INDEX_SAMPLE_RATE = float(os.environ.get("BOOK_INDEX_SAMPLE_RATE", 0.1))
+BOOK_INDEX_MAX_VOLUMES = int(os.environ.get("BOOK_INDEX_MAX_VOLUMES", 10000))
+BOOK_INDEX_SNAPSHOT_PATH = os.environ.get("BOOK_INDEX_SNAPSHOT_PATH") or None
+BOOK_INDEX_SNAPSHOT_INTERVAL = int(os.environ.get("BOOK_INDEX_SNAPSHOT_INTERVAL", 300))
+# Upstream bodies waiting to be indexed; more are dropped, not queued
+BOOK_INDEX_MAX_PENDING = int(os.environ.get("BOOK_INDEX_MAX_PENDING", 64))
+SUGGEST_MAX_RESULTS = 10
+
+# Streaming deep-pagination search settings
+SEARCH_STREAM_PAGE_SIZE = 40  # Google's maximum maxResults
+SEARCH_STREAM_MAX_RESULTS = int(os.environ.get("SEARCH_STREAM_MAX_RESULTS", 400))
+SEARCH_STREAM_TIMEOUT = float(os.environ.get("SEARCH_STREAM_TIMEOUT", 15))
+# Pages in flight per stream, and a pool of its own so streams can't starve
+# the batch, related-books and My Library fan-out on UPSTREAM_EXECUTOR
+SEARCH_STREAM_CONCURRENCY = int(os.environ.get("SEARCH_STREAM_CONCURRENCY", 3))
+SEARCH_STREAM_WORKERS = int(os.environ.get("SEARCH_STREAM_WORKERS", 8))
+
+# Bulk shelf mutation and import/export settings
+SHELF_BULK_MAX_OPERATIONS = int(os.environ.get("SHELF_BULK_MAX_OPERATIONS", 500))
+MYLIBRARY_BULK_CONCURRENCY = int(os.environ.get("MYLIBRARY_BULK_CONCURRENCY", 4))
+SHELF_IMPORT_BATCH_SIZE = int(os.environ.get("SHELF_IMPORT_BATCH_SIZE", 200))
+SHELF_IMPORT_MAX_LINE_BYTES = int(os.environ.get("SHELF_IMPORT_MAX_LINE_BYTES", 1024 * 1024))
+SHELF_EXPORT_PAGE_SIZE = 200
+
+# Related books settings
+RELATED_CACHE_TTL = int(os.environ.get("RELATED_CACHE_TTL", 1800))
+RELATED_MAX_RESULTS = int(os.environ.get("RELATED_MAX_RESULTS", 5))
+
+# Speculative next-page prefetch for search (opt-in)
+SEARCH_PREFETCH = os.environ.get("SEARCH_PREFETCH", "false").lower() == "true"
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", 2))
+PREFETCH_MAX_PENDING = int(os.environ.get("PREFETCH_MAX_PENDING", 8))
+PREFETCH_MAX_PER_MINUTE = int(os.environ.get("PREFETCH_MAX_PER_MINUTE", 60))
+PREFETCH_MAX_PAGES_PER_QUERY = int(os.environ.get("PREFETCH_MAX_PAGES_PER_QUERY", 3))
+PREFETCH_MAX_UPSTREAM_IN_FLIGHT = int(os.environ.get("PREFETCH_MAX_UPSTREAM_IN_FLIGHT", 16))
+
+# Bounded worker pool for server-side upstream fan-out (batch lookups,
+# related books), shared by all requests
+UPSTREAM_MAX_WORKERS = int(os.environ.get("UPSTREAM_MAX_WORKERS", 8))
+UPSTREAM_EXECUTOR = ThreadPoolExecutor(max_workers=UPSTREAM_MAX_WORKERS, thread_name_prefix="upstream")
+SEARCH_STREAM_EXECUTOR = ThreadPoolExecutor(max_workers=SEARCH_STREAM_WORKERS, thread_name_prefix="search-stream")
+
+# OAuth setup. Authlib and its cryptography stack take longer to import than
+# the rest of the app, and only the login flow needs them, so the client is
+# created on first use instead of on every cold start.
+_google_client = None
+_google_client_lock = threading.Lock()
+
+def google_oauth_client():
+    global _google_client
+    with _google_client_lock:
+        if _google_client is None:
+            from authlib.integrations.flask_client import OAuth
+            oauth = OAuth(app)
+            _google_client = oauth.register(
+                name='google',
+                client_id=GOOGLE_CLIENT_ID,
+                client_secret=GOOGLE_CLIENT_SECRET,
+                access_token_url='https://accounts.google.com/o/oauth2/token',
+                access_token_params=None,
+                authorize_url='https://accounts.google.com/o/oauth2/auth',
+                authorize_params=None,
+                api_base_url='https://www.googleapis.com/oauth2/v1/',
+                client_kwargs={'scope': 'https://www.googleapis.com/auth/books'}
+            )
+        return _google_client
+
 # Authentication decorator
 def login_required(f):
     @wraps(f)
@@ -70,11 +1388,461 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# Helper function to get or create user's bookshelves
-def get_user_local_bookshelves(user_id):
-    if user_id not in LOCAL_BOOKSHELVES:
-        LOCAL_BOOKSHELVES[user_id] = DEFAULT_SHELVES.copy()
-    return LOCAL_BOOKSHELVES[user_id]
+# Local bookshelf stores. Both backends expose the same methods:
+#   list_shelves(user_id)                   -> [{id, name, bookCount}]
+#   get_shelf(user_id, shelf_id)            -> {id, name, bookCount} or None
+#   get_books(user_id, shelf_id, limit, cursor, sort, order)
+#                                           -> (books, next_cursor) or None if no shelf
+#   add_book(user_id, shelf_id, book_entry) -> True if added, False if present, None if no shelf
+#   remove_book(user_id, shelf_id, book_id) -> True if removed, False if absent, None if no shelf
+#
+# Books are returned in insertion order unless sort is "addedAt" or "title".
+# Cursors are opaque tokens produced by encode_shelf_cursor.
+SHELF_SORT_OPTIONS = ("addedAt", "title")
+SHELF_PAGE_MAX_LIMIT = int(os.environ.get("SHELF_PAGE_MAX_LIMIT", 200))
+
+def encode_shelf_cursor(sort, position):
+    token = json.dumps([sort or ""] + position, separators=(",", ":"))
+    return base64.urlsafe_b64encode(token.encode()).decode().rstrip("=")
+
+# Returns the sort position encoded in a cursor, rejecting cursors that were
+# issued for a different sort
+def decode_shelf_cursor(cursor, sort):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        token = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    types = (str, int) if sort else (int,)
+    if (
+        not isinstance(token, list)
+        or len(token) != len(types) + 1
+        or token[0] != (sort or "")
+        or not all(isinstance(value, kind) for value, kind in zip(token[1:], types))
+    ):
+        raise ValueError("Invalid cursor")
+    return token[1:]
+
+def shelf_title_key(volume_info):
+    return str((volume_info or {}).get("title") or "").casefold()
+
+# Shelf entries only reference volume metadata by content hash. The metadata
+# itself is stored once per distinct volumeInfo as compressed canonical JSON,
+# so a popular book on thousands of shelves costs one copy.
+def pack_volume_info(volume_info):
+    canonical = json.dumps(volume_info, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(canonical, digest_size=16).hexdigest(), zlib.compress(canonical)
+
+def unpack_volume_info(blob):
+    return json.loads(zlib.decompress(blob))
+
+# Reference-counted volume metadata shared by every shelf in a MemoryShelfStore
+class MemoryVolumeStore:
+    def __init__(self):
+        self._volumes = {}  # hash -> [refcount, blob]
+
+    def acquire(self, volume_info):
+        volume_hash, blob = pack_volume_info(volume_info)
+        entry = self._volumes.get(volume_hash)
+        if entry is None:
+            self._volumes[volume_hash] = [1, blob]
+        else:
+            entry[0] += 1
+        return volume_hash
+
+    def release(self, volume_hash):
+        entry = self._volumes.get(volume_hash)
+        if entry is not None:
+            entry[0] -= 1
+            if entry[0] <= 0:
+                del self._volumes[volume_hash]
+
+    def blob(self, volume_hash):
+        return self._volumes[volume_hash][1]
+
+    def __len__(self):
+        return len(self._volumes)
+
+# Compact per-shelf record; volumeInfo is joined from the volume store on read
+ShelfEntry = namedtuple("ShelfEntry", ["seq", "book_id", "added_at", "title_key", "volume_hash"])
+
+# Joins shelf rows with their volume metadata, decoding each distinct volume once
+def join_shelf_books(rows, load_volume):
+    decoded = {}
+    books = []
+    for book_id, added_at, volume_hash in rows:
+        if volume_hash not in decoded:
+            decoded[volume_hash] = load_volume(volume_hash)
+        books.append({"id": book_id, "addedAt": added_at, "volumeInfo": decoded[volume_hash]})
+    return books
+
+# Bulk shelf operations are tuples: ("add", shelf_id, book_entry),
+# ("remove", shelf_id, book_id) or ("move", from_shelf_id, to_shelf_id, book_id).
+# Like add_book/remove_book, each returns None if a shelf is missing, False if
+# there was nothing to do and True once applied.
+def apply_shelf_operation(store, user_id, operation):
+    kind = operation[0]
+    if kind == "add":
+        return store._add(user_id, *operation[1:])
+    if kind == "remove":
+        return store._remove(user_id, *operation[1:])
+    if kind == "move":
+        return store._move(user_id, *operation[1:])
+    raise ValueError(f"Unknown shelf operation: {kind}")
+
+class MemoryShelfStore:
+    def __init__(self):
+        # Format: user_id: { shelf_id: { name: "shelf_name", books: OrderedDict(book_id -> ShelfEntry) } }
+        # The OrderedDict keeps insertion order and gives O(1) add, remove and lookup by ID.
+        self._shelves = {}
+        self._volumes = MemoryVolumeStore()
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _user_shelves(self, user_id):
+        if user_id not in self._shelves:
+            self._shelves[user_id] = {
+                shelf_id: {"name": shelf["name"], "books": OrderedDict()}
+                for shelf_id, shelf in DEFAULT_SHELVES.items()
+            }
+        return self._shelves[user_id]
+
+    def list_shelves(self, user_id):
+        with self._lock:
+            return [
+                {"id": shelf_id, "name": shelf["name"], "bookCount": len(shelf["books"])}
+                for shelf_id, shelf in self._user_shelves(user_id).items()
+            ]
+
+    def get_shelf(self, user_id, shelf_id):
+        with self._lock:
+            shelf = self._user_shelves(user_id).get(shelf_id)
+            if shelf is None:
+                return None
+            return {"id": shelf_id, "name": shelf["name"], "bookCount": len(shelf["books"])}
+
+    def get_books(self, user_id, shelf_id, limit=None, cursor=None, sort=None, order="asc"):
+        with self._lock:
+            shelf = self._user_shelves(user_id).get(shelf_id)
+            if shelf is None:
+                return None
+            items = list(shelf["books"].values())
+            # Copy the blobs now: once the lock is released a concurrent
+            # remove may drop the last reference to a volume
+            blobs = {item.volume_hash: self._volumes.blob(item.volume_hash) for item in items}
+
+        if sort == "addedAt":
+            position = lambda item: [item.added_at, item.seq]
+        elif sort == "title":
+            position = lambda item: [item.title_key, item.seq]
+        else:
+            position = lambda item: [item.seq]
+
+        # Insertion order is already sorted by sequence number
+        if sort:
+            items.sort(key=position)
+        if order == "desc":
+            items.reverse()
+        if cursor is not None:
+            if order == "desc":
+                items = [item for item in items if position(item) < cursor]
+            else:
+                items = [item for item in items if position(item) > cursor]
+
+        next_cursor = None
+        if limit is not None and len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_shelf_cursor(sort, position(items[-1]))
+
+        books = join_shelf_books(
+            [(item.book_id, item.added_at, item.volume_hash) for item in items],
+            lambda volume_hash: unpack_volume_info(blobs[volume_hash]),
+        )
+        return books, next_cursor
+
+    def add_book(self, user_id, shelf_id, book_entry):
+        with self._lock:
+            return self._add(user_id, shelf_id, book_entry)
+
+    def remove_book(self, user_id, shelf_id, book_id):
+        with self._lock:
+            return self._remove(user_id, shelf_id, book_id)
+
+    # Applies a list of shelf operations atomically; see apply_shelf_operation
+    def apply_operations(self, user_id, operations):
+        with self._lock:
+            return [apply_shelf_operation(self, user_id, operation) for operation in operations]
+
+    # The helpers below expect the lock to be held
+    def _add(self, user_id, shelf_id, book_entry):
+        shelf = self._user_shelves(user_id).get(shelf_id)
+        if shelf is None:
+            return None
+        if book_entry["id"] in shelf["books"]:
+            return False
+        shelf["books"][book_entry["id"]] = ShelfEntry(
+            next(self._seq),
+            book_entry["id"],
+            book_entry["addedAt"],
+            shelf_title_key(book_entry["volumeInfo"]),
+            self._volumes.acquire(book_entry["volumeInfo"]),
+        )
+        return True
+
+    def _remove(self, user_id, shelf_id, book_id):
+        shelf = self._user_shelves(user_id).get(shelf_id)
+        if shelf is None:
+            return None
+        entry = shelf["books"].pop(book_id, None)
+        if entry is None:
+            return False
+        self._volumes.release(entry.volume_hash)
+        return True
+
+    # A moved book goes to the end of the target shelf, like a new addition
+    def _move(self, user_id, from_shelf_id, to_shelf_id, book_id):
+        shelves = self._user_shelves(user_id)
+        source, target = shelves.get(from_shelf_id), shelves.get(to_shelf_id)
+        if source is None or target is None:
+            return None
+        entry = source["books"].pop(book_id, None)
+        if entry is None:
+            return False
+        if book_id in target["books"]:
+            self._volumes.release(entry.volume_hash)
+        else:
+            target["books"][book_id] = entry._replace(seq=next(self._seq))
+        return True
+
+# SQLite store in WAL mode so several worker processes can read while one
+# writes. Books are keyed on (user_id, shelf_id, book_id) and ordered by rowid,
+# which preserves insertion order without scanning the shelf. Volume metadata
+# lives once per content hash in the volumes table and is garbage collected
+# when the last shelf entry referencing it is removed.
+class SQLiteShelfStore(SQLiteDatabase):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS shelves (
+            user_id TEXT NOT NULL,
+            shelf_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            PRIMARY KEY (user_id, shelf_id)
+        );
+        CREATE TABLE IF NOT EXISTS shelf_books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            shelf_id TEXT NOT NULL,
+            book_id TEXT NOT NULL,
+            added_at TEXT NOT NULL DEFAULT '',
+            title_key TEXT NOT NULL DEFAULT '',
+            volume_hash TEXT NOT NULL DEFAULT '',
+            UNIQUE (user_id, shelf_id, book_id)
+        );
+        CREATE TABLE IF NOT EXISTS volumes (
+            hash TEXT PRIMARY KEY,
+            data BLOB NOT NULL
+        ) WITHOUT ROWID;
+    """
+
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS shelf_books_added_at ON shelf_books (user_id, shelf_id, added_at, id);
+        CREATE INDEX IF NOT EXISTS shelf_books_title ON shelf_books (user_id, shelf_id, title_key, id);
+        CREATE INDEX IF NOT EXISTS shelf_books_volume ON shelf_books (volume_hash);
+    """
+
+    # Keyset pagination: ORDER BY columns for each sort option
+    SORT_COLUMNS = {
+        None: ("id",),
+        "addedAt": ("added_at", "id"),
+        "title": ("title_key", "id"),
+    }
+
+    def _gc_volume(self, conn, volume_hash):
+        conn.execute(
+            "DELETE FROM volumes WHERE hash = ? "
+            "AND NOT EXISTS (SELECT 1 FROM shelf_books WHERE volume_hash = ?)",
+            (volume_hash, volume_hash),
+        )
+
+    def __init__(self, path):
+        super().__init__(path)
+        conn = self._connection()
+        conn.executescript(self.SCHEMA)
+        with self._write() as conn:
+            self._migrate(conn)
+        conn.executescript(self.INDEXES)
+
+    # Bring databases created by older releases up to the current schema
+    def _migrate(self, conn):
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(shelf_books)")]
+        if "title_key" not in columns:
+            conn.execute("ALTER TABLE shelf_books ADD COLUMN title_key TEXT NOT NULL DEFAULT ''")
+            rows = conn.execute("SELECT id, volume_info FROM shelf_books").fetchall()
+            conn.executemany(
+                "UPDATE shelf_books SET title_key = ? WHERE id = ?",
+                [(shelf_title_key(json.loads(volume_info)), row_id) for row_id, volume_info in rows],
+            )
+            columns.append("title_key")
+        if "volume_hash" not in columns:
+            # Move inline volume_info into the shared volumes table
+            conn.execute("ALTER TABLE shelf_books ADD COLUMN volume_hash TEXT NOT NULL DEFAULT ''")
+            rows = conn.execute("SELECT id, volume_info FROM shelf_books").fetchall()
+            for row_id, volume_info in rows:
+                volume_hash, blob = pack_volume_info(json.loads(volume_info))
+                conn.execute("INSERT OR IGNORE INTO volumes (hash, data) VALUES (?, ?)", (volume_hash, blob))
+                conn.execute("UPDATE shelf_books SET volume_hash = ? WHERE id = ?", (volume_hash, row_id))
+            conn.execute("ALTER TABLE shelf_books DROP COLUMN volume_info")
+
+    def _ensure_user(self, user_id):
+        conn = self._connection()
+        if conn.execute("SELECT 1 FROM shelves WHERE user_id = ? LIMIT 1", (user_id,)).fetchone():
+            return
+        with self._write() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO shelves (user_id, shelf_id, name) VALUES (?, ?, ?)",
+                [(user_id, shelf_id, shelf["name"]) for shelf_id, shelf in DEFAULT_SHELVES.items()],
+            )
+
+    def _shelf_name(self, conn, user_id, shelf_id):
+        row = conn.execute(
+            "SELECT name FROM shelves WHERE user_id = ? AND shelf_id = ?", (user_id, shelf_id)
+        ).fetchone()
+        return row[0] if row else None
+
+    def list_shelves(self, user_id):
+        self._ensure_user(user_id)
+        rows = self._connection().execute(
+            """
+            SELECT s.shelf_id, s.name,
+                   (SELECT COUNT(*) FROM shelf_books b
+                    WHERE b.user_id = s.user_id AND b.shelf_id = s.shelf_id)
+            FROM shelves s WHERE s.user_id = ? ORDER BY s.rowid
+            """,
+            (user_id,),
+        ).fetchall()
+        return [{"id": shelf_id, "name": name, "bookCount": count} for shelf_id, name, count in rows]
+
+    def get_shelf(self, user_id, shelf_id):
+        self._ensure_user(user_id)
+        conn = self._connection()
+        name = self._shelf_name(conn, user_id, shelf_id)
+        if name is None:
+            return None
+        count = conn.execute(
+            "SELECT COUNT(*) FROM shelf_books WHERE user_id = ? AND shelf_id = ?", (user_id, shelf_id)
+        ).fetchone()[0]
+        return {"id": shelf_id, "name": name, "bookCount": count}
+
+    def get_books(self, user_id, shelf_id, limit=None, cursor=None, sort=None, order="asc"):
+        self._ensure_user(user_id)
+        conn = self._connection()
+        if self._shelf_name(conn, user_id, shelf_id) is None:
+            return None
+
+        columns = self.SORT_COLUMNS[sort]
+        direction = "DESC" if order == "desc" else "ASC"
+        # Volume data is read in the same statement, so a concurrent remove
+        # can't garbage collect it between reading the rows and the join
+        query = (
+            "SELECT book_id, added_at, volume_hash, (SELECT data FROM volumes WHERE hash = volume_hash), "
+            f"{', '.join(columns)} FROM shelf_books WHERE user_id = ? AND shelf_id = ?"
+        )
+        args = [user_id, shelf_id]
+        if cursor is not None:
+            query += f" AND ({', '.join(columns)}) {'<' if order == 'desc' else '>'} ({', '.join('?' * len(columns))})"
+            args.extend(cursor)
+        query += " ORDER BY " + ", ".join(f"{column} {direction}" for column in columns)
+        if limit is not None:
+            # Fetch one extra row to know whether there is a next page
+            query += " LIMIT ?"
+            args.append(limit + 1)
+
+        rows = conn.execute(query, args).fetchall()
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_shelf_cursor(sort, list(rows[-1][4:]))
+        blobs = {row[2]: row[3] for row in rows}
+        books = join_shelf_books(
+            [row[:3] for row in rows],
+            lambda volume_hash: unpack_volume_info(blobs[volume_hash]) if blobs[volume_hash] else {},
+        )
+        return books, next_cursor
+
+    def add_book(self, user_id, shelf_id, book_entry):
+        self._ensure_user(user_id)
+        with self._write() as conn:
+            return self._add(user_id, shelf_id, book_entry)
+
+    def remove_book(self, user_id, shelf_id, book_id):
+        self._ensure_user(user_id)
+        with self._write() as conn:
+            return self._remove(user_id, shelf_id, book_id)
+
+    # Applies a list of shelf operations in one transaction; see apply_shelf_operation
+    def apply_operations(self, user_id, operations):
+        self._ensure_user(user_id)
+        with self._write():
+            return [apply_shelf_operation(self, user_id, operation) for operation in operations]
+
+    # The helpers below run inside a _write() transaction on this thread's connection
+    def _add(self, user_id, shelf_id, book_entry):
+        conn = self._connection()
+        if self._shelf_name(conn, user_id, shelf_id) is None:
+            return None
+        volume_hash, blob = pack_volume_info(book_entry["volumeInfo"])
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO shelf_books (user_id, shelf_id, book_id, added_at, title_key, volume_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                user_id, shelf_id, book_entry["id"], book_entry["addedAt"],
+                shelf_title_key(book_entry["volumeInfo"]), volume_hash,
+            ),
+        )
+        if cursor.rowcount == 0:
+            return False
+        conn.execute("INSERT OR IGNORE INTO volumes (hash, data) VALUES (?, ?)", (volume_hash, blob))
+        return True
+
+    def _remove(self, user_id, shelf_id, book_id):
+        conn = self._connection()
+        if self._shelf_name(conn, user_id, shelf_id) is None:
+            return None
+        row = conn.execute(
+            "DELETE FROM shelf_books WHERE user_id = ? AND shelf_id = ? AND book_id = ? RETURNING volume_hash",
+            (user_id, shelf_id, book_id),
+        ).fetchone()
+        if row is None:
+            return False
+        self._gc_volume(conn, row[0])
+        return True
+
+    # A moved book gets a new row id so it sorts last on the target shelf,
+    # like a new addition
+    def _move(self, user_id, from_shelf_id, to_shelf_id, book_id):
+        conn = self._connection()
+        if self._shelf_name(conn, user_id, from_shelf_id) is None or self._shelf_name(conn, user_id, to_shelf_id) is None:
+            return None
+        row = conn.execute(
+            "DELETE FROM shelf_books WHERE user_id = ? AND shelf_id = ? AND book_id = ? "
+            "RETURNING added_at, title_key, volume_hash",
+            (user_id, from_shelf_id, book_id),
+        ).fetchone()
+        if row is None:
+            return False
+        conn.execute(
+            "INSERT OR IGNORE INTO shelf_books (user_id, shelf_id, book_id, added_at, title_key, volume_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, to_shelf_id, book_id) + tuple(row),
+        )
+        self._gc_volume(conn, row[2])
+        return True
+
+def create_shelf_store():
+    if SHELF_STORE_BACKEND == "memory":
+        return MemoryShelfStore()
+    return SQLiteShelfStore(SHELF_DB_PATH)
+
+SHELF_STORE = create_shelf_store()
 
 # Authentication routes
 @app.route('/api/auth/login')
@@ -83,13 +1851,14 @@ def login():
         return jsonify({"error": "OAuth credentials not configured"}), 503
         
     redirect_uri = url_for('authorize', _external=True)
-    return google.authorize_redirect(redirect_uri)
+    return google_oauth_client().authorize_redirect(redirect_uri)
 
 @app.route('/api/auth/authorize')
 def authorize():
     if not GOOGLE_CLIENT_ID or not GOOGLE_CLIENT_SECRET:
         return jsonify({"error": "OAuth credentials not configured"}), 503
         
+    google = google_oauth_client()
     token = google.authorize_access_token()
     session['access_token'] = token['access_token']
     # Get user info
@@ -116,27 +1885,37 @@ def auth_status():
         "oauth_configured": bool(GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET)
     })
 
-# Helper function for API requests
-def make_api_request(url, method="GET", data=None):
-    headers = {}
+# Helper function to send an upstream request with the session's auth token
+def send_api_request(url, method="GET", data=None, headers=None):
+    # Worker threads have no session, so fan-out callers pass auth_headers() in
+    headers = dict(headers) if headers is not None else auth_headers()
     
+    if method == "GET":
+        return upstream_get(url, headers=headers)
+    elif method == "POST":
+        headers['Content-Type'] = 'application/json'
+        return upstream_request("POST", url, PRIORITY_WRITE, headers=headers, json=data if data else {})
+    elif method == "DELETE":
+        return upstream_request("DELETE", url, PRIORITY_WRITE, headers=headers)
+    raise ValueError(f"Unsupported method: {method}")
+
+def auth_headers():
     # Add auth token if available in session
     if 'access_token' in session:
-        headers['Authorization'] = f"Bearer {session['access_token']}"
-        
+        return {'Authorization': f"Bearer {session['access_token']}"}
+    return {}
+
+# Helper function for API requests whose result needs to be inspected
+def make_api_request(url, method="GET", data=None, headers=None):
     try:
-        if method == "GET":
-            response = requests.get(url, headers=headers, timeout=10)
-        elif method == "POST":
-            headers['Content-Type'] = 'application/json'
-            response = requests.post(url, headers=headers, json=data if data else {}, timeout=10)
-        elif method == "DELETE":
-            response = requests.delete(url, headers=headers, timeout=10)
+        response = send_api_request(url, method, data, headers)
         
         if response.status_code == 204:  # No content response
             return {}, 204
             
         return response.json(), response.status_code
+    except UpstreamUnavailable as e:
+        return {"error": str(e)}, 503
     except requests.exceptions.Timeout:
         return {"error": "Request timed out"}, 504
     except requests.exceptions.RequestException as e:
@@ -144,13 +1923,494 @@ def make_api_request(url, method="GET", data=None):
     except Exception as e:
         return {"error": str(e)}, 500
 
+# Helper function for API requests that are passed through unchanged: the
+# upstream JSON bytes go straight to the client without being re-parsed
+# With a cache and key, GET responses are served from and stored in it.
+def proxy_api_request(url, method="GET", data=None, cache=None, cache_key=None, ttl=0):
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return json_body_response(cached.body, etag=cached.etag)
+    
+    try:
+        response = send_api_request(url, method, data)
+        
+        if response.status_code == 204:  # No content response
+            return jsonify({}), 204
+        
+        body = upstream_json_body(response)
+        if cache is not None and response.status_code == 200:
+            cached = CachedBody(body, make_etag(body))
+            cache.set(cache_key, cached, ttl, len(body))
+            return json_body_response(body, etag=cached.etag)
+        return json_body_response(body, response.status_code)
+    except UpstreamUnavailable as e:
+        return unavailable_response(e)
+    except requests.exceptions.Timeout:
+        return jsonify({"error": "Request timed out"}), 504
+    except requests.exceptions.RequestException as e:
+        return jsonify({"error": f"Request failed: {str(e)}"}), 500
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Response for a cached body; stale copies are flagged and must not be cached
+# by the browser
+def cached_body_response(cached, max_age):
+    if cached.stale_age is not None:
+        response = json_body_response(cached.body, cache_control="no-cache", etag=cached.etag)
+        return mark_stale(response, cached.stale_age)
+    return json_body_response(cached.body, cache_control=f"public, max-age={max_age}", etag=cached.etag)
+
+def mark_stale(response, stale_age):
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Warning"] = '110 - "Response is Stale"'
+    response.headers["X-Cache-Stale-Age"] = str(int(stale_age))
+    return response
+
+def unavailable_response(error):
+    response = jsonify({"error": str(error)})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+# Returns the raw JSON body of an upstream response, without parsing it
+def upstream_json_body(response):
+    if "json" not in response.headers.get("Content-Type", ""):
+        raise ValueError("Upstream response is not JSON")
+    return response.content
+
+# Builds a response from an already-encoded JSON body
+def json_body_response(body, status=200, cache_control=None, etag=None):
+    response = app.response_class(body, status=status, mimetype="application/json")
+    if cache_control:
+        response.headers["Cache-Control"] = cache_control
+    if etag:
+        response.set_etag(etag)
+    return response
+
+# Conditional GET and compression for every JSON API response. Cached bodies
+# arrive with their ETag already set; anything else is hashed here. A strong
+# ETag is per representation, so compressed variants get an encoding suffix.
+@app.after_request
+def finalize_json_response(response):
+    if response.mimetype != "application/json" or response.is_streamed or response.direct_passthrough:
+        return response
+    
+    if request.method == "GET" and response.status_code == 200:
+        etag, weak = response.get_etag()
+        if not etag or weak:
+            etag = make_etag(response.get_data())
+        
+        # Responses without explicit caching rules (shelves, My Library) must
+        # be revalidated by the browser on every use
+        if "Cache-Control" not in response.headers:
+            response.headers["Cache-Control"] = "private, no-cache"
+        
+        candidates = [etag] + [f"{etag}-{encoding}" for encoding in COMPRESSION_ENCODINGS]
+        matched = next((candidate for candidate in candidates if request.if_none_match.contains(candidate)), None)
+        if matched:
+            not_modified = app.response_class(status=304)
+            not_modified.set_etag(matched)
+            for header in ("Cache-Control", "Vary"):
+                if header in response.headers:
+                    not_modified.headers[header] = response.headers[header]
+            not_modified.vary.add("Accept-Encoding")
+            return not_modified
+        response.set_etag(etag)
+    
+    return compress_response(response)
+
+def compress_response(response):
+    response.vary.add("Accept-Encoding")
+    if "Content-Encoding" in response.headers or response.status_code in (204, 304):
+        return response
+    
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    
+    encoding = next(
+        (encoding for encoding in COMPRESSION_ENCODINGS if request.accept_encodings[encoding]),
+        None,
+    )
+    if encoding is None:
+        return response
+    
+    etag, _ = response.get_etag()
+    cache_key = ("compressed", encoding, etag) if etag else None
+    compressed = COMPRESSED_CACHE.get(cache_key) if cache_key else None
+    if compressed is None:
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+        else:
+            compressed = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        if cache_key:
+            COMPRESSED_CACHE.set(cache_key, compressed, COMPRESSED_CACHE_TTL, len(compressed))
+    
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    if etag:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+# Cache key for a search; params must not include the API key yet
+def search_cache_key(params, field_tree=None):
+    cache_params = dict(params)
+    if field_tree:
+        selector = google_fields_selector(field_tree)
+        cache_params["fields" if SEARCH_UPSTREAM_FIELDS else "localFields"] = selector
+    return make_cache_key("search", cache_params)
+
+# Helper function to run a volume search, served from cache when possible.
+# Returns (CachedBody, 200) on success or (error dict, status) on failure.
+def fetch_search(params, field_tree=None, priority=PRIORITY_SEARCH):
+    params = dict(params)
+    if field_tree and SEARCH_UPSTREAM_FIELDS:
+        params["fields"] = google_fields_selector(field_tree)
+    
+    cache_key = search_cache_key(params, field_tree)
+    cached = RESPONSE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached, 200
+    
+    # Add API key if available
+    if API_KEY:
+        params["key"] = API_KEY
+    
+    url = f"{VOLUMES_ENDPOINT}?{urlencode(params)}"
+    
+    try:
+        # Add timeout to prevent long-running requests
+        response = upstream_get(url, priority=priority)
+        
+        if response.status_code != 200:
+            return stale_or_error(cache_key, {
+                "error": f"Google Books API returned an error: {response.status_code}"
+            }, response.status_code)
+            
+        body = upstream_json_body(response)
+        if BOOK_INDEX is not None:
+            BOOK_INDEX.add_body(body)
+        if field_tree and not SEARCH_UPSTREAM_FIELDS:
+            body = app.json.dumps(project_fields(app.json.loads(body), field_tree)).encode()
+        return cache_body(cache_key, body, SEARCH_CACHE_TTL), 200
+        
+    except UpstreamUnavailable as e:
+        return stale_or_error(cache_key, {"error": str(e)}, 503)
+    except requests.exceptions.Timeout:
+        return stale_or_error(cache_key, {"error": "Request to Google Books API timed out"}, 504)
+    except requests.exceptions.RequestException as e:
+        return stale_or_error(cache_key, {"error": f"Error connecting to Google Books API: {str(e)}"}, 502)
+    except ValueError as e:  # Non-JSON response
+        return stale_or_error(cache_key, {"error": "Invalid response from Google Books API"}, 502)
+
+# Warms the search cache with the page after the one just served. Work is
+# dropped rather than queued whenever a budget is exhausted: the global
+# pending and per-minute limits, the per-query page limit, or upstream
+# pressure (many calls in flight or a recent 429/5xx/timeout).
+class SearchPrefetcher:
+    def __init__(self, workers, max_pending, max_per_minute, max_pages_per_query):
+        self.max_pending = max_pending
+        self.max_per_minute = max_per_minute
+        self.max_pages_per_query = max_pages_per_query
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._pending = 0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        # Pages prefetched per query, forgotten with the search cache TTL
+        self._per_query = ResponseCache(4096, 4096)
+        self._lock = threading.Lock()
+
+    def _reserve(self, query_key):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._window_start >= 60:
+                self._window_start, self._window_count = now, 0
+            pages = self._per_query.get(query_key) or 0
+            if (
+                self._pending >= self.max_pending
+                or self._window_count >= self.max_per_minute
+                or pages >= self.max_pages_per_query
+            ):
+                return False
+            self._pending += 1
+            self._window_count += 1
+            self._per_query.set(query_key, pages + 1, SEARCH_CACHE_TTL, 1)
+            return True
+
+    def _run(self, params, field_tree):
+        try:
+            fetch_search(params, field_tree, PRIORITY_PREFETCH)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def maybe_prefetch(self, params, field_tree, body):
+        # An empty page means there is nothing after it
+        if b'"items"' not in body:
+            return
+        if (
+            upstream_pressure.in_flight >= PREFETCH_MAX_UPSTREAM_IN_FLIGHT
+            or upstream_pressure.recently_failed()
+            or upstream_scheduler.paused()
+        ):
+            return
+        try:
+            start_index = int(params.get("startIndex", 0))
+            max_results = int(params.get("maxResults", 10))
+        except ValueError:
+            return
+        
+        next_params = dict(params, startIndex=str(start_index + max_results))
+        # lookup() rather than get(), so the probe isn't counted as a cache hit or miss
+        if RESPONSE_CACHE.lookup(search_cache_key(next_params, field_tree)) is not None:
+            return
+        
+        query_key = make_cache_key("prefetch", {k: v for k, v in params.items() if k != "startIndex"})
+        if self._reserve(query_key):
+            self._executor.submit(self._run, next_params, field_tree)
+
+search_prefetcher = SearchPrefetcher(
+    PREFETCH_WORKERS, PREFETCH_MAX_PENDING, PREFETCH_MAX_PER_MINUTE, PREFETCH_MAX_PAGES_PER_QUERY
+)
+
+# Local inverted index over the title, authors and categories of every volume
+# we have seen: search pages, volume details and books saved to local shelves.
+# It powers /api/books/suggest and answers searches when Google is
+# unreachable or over quota. Memory is bounded by BOOK_INDEX_MAX_VOLUMES,
+# evicting the least recently seen volume. Tokens are kept in a sorted list
+# alongside their postings, so a prefix maps to a contiguous range found by
+# bisection. Volumes are indexed on a background thread, off the request path;
+# if it falls behind by BOOK_INDEX_MAX_PENDING batches, new ones are dropped.
+IndexedVolume = namedtuple("IndexedVolume", ["volume", "title_tokens", "tokens", "seq"])
+
+def index_tokens(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"\w+", text)
+
+class BookIndex:
+    # Index only what a result card needs
+    VOLUME_FIELDS = ("title", "subtitle", "authors", "categories", "publishedDate", "imageLinks")
+    # How many tokens one prefix may expand to, to bound per-keystroke work
+    MAX_PREFIX_EXPANSION = 64
+
+    def __init__(self, max_volumes, snapshot_path=None, snapshot_interval=300, max_pending=64, sample_rate=1.0):
+        self.max_volumes = max_volumes
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._volumes = OrderedDict()  # volume_id -> IndexedVolume, least recently seen first
+        self._postings = {}  # token -> set of volume IDs
+        self._tokens = []  # sorted keys of _postings
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._executor_lock = threading.Lock()
+        self._executor = None
+        self._pid = None  # Process the indexing thread belongs to
+        self._pending = 0
+        self._dirty = False
+        self._last_snapshot = time.monotonic()
+
+    def __len__(self):
+        return len(self._volumes)
+
+    def _compact(self, volume):
+        volume_info = volume.get("volumeInfo") or {}
+        compact = {field: volume_info[field] for field in self.VOLUME_FIELDS if volume_info.get(field)}
+        if "imageLinks" in compact:
+            compact["imageLinks"] = {
+                size: link for size, link in compact["imageLinks"].items() if size in ("smallThumbnail", "thumbnail")
+            }
+        return {"id": volume["id"], "volumeInfo": compact}
+
+    def _add(self, volume):
+        volume_id = volume.get("id")
+        if not volume_id or not (volume.get("volumeInfo") or {}).get("title"):
+            return
+        self._remove(volume_id)
+        volume = self._compact(volume)
+        volume_info = volume["volumeInfo"]
+        title_tokens = frozenset(index_tokens(volume_info["title"] + " " + volume_info.get("subtitle", "")))
+        tokens = set(title_tokens)
+        for name in volume_info.get("authors", []) + volume_info.get("categories", []):
+            tokens.update(index_tokens(str(name)))
+        self._volumes[volume_id] = IndexedVolume(volume, title_tokens, frozenset(tokens), next(self._seq))
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                bisect.insort(self._tokens, token)
+            postings.add(volume_id)
+        while len(self._volumes) > self.max_volumes:
+            self._remove(next(iter(self._volumes)))
+
+    def _remove(self, volume_id):
+        entry = self._volumes.pop(volume_id, None)
+        if entry is None:
+            return
+        for token in entry.tokens:
+            postings = self._postings[token]
+            postings.discard(volume_id)
+            if not postings:
+                del self._postings[token]
+                del self._tokens[bisect.bisect_left(self._tokens, token)]
+
+    # Queue volumes, or a raw upstream search page or volume body, for indexing
+    def add_volumes(self, volumes):
+        self._submit(self._index, volumes)
+
+    def add_body(self, body):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        self._submit(self._index_body, body)
+
+    def _submit(self, fn, arg):
+        self.start()
+        with self._executor_lock:
+            if self._pending >= self.max_pending:
+                metrics.inc("bookfinder_book_index_dropped_total")
+                return
+            self._pending += 1
+        self._executor.submit(self._run, fn, arg)
+
+    def _run(self, fn, arg):
+        try:
+            fn(arg)
+        finally:
+            with self._executor_lock:
+                self._pending -= 1
+
+    def _index_body(self, body):
+        try:
+            data = app.json.loads(body)
+        except ValueError:
+            return
+        if not isinstance(data, dict):
+            return
+        if "items" in data or data.get("kind") == "books#volumes":
+            self._index(data.get("items") or [])
+        else:
+            self._index([data])
+
+    def _index(self, volumes):
+        with self._lock:
+            for volume in volumes:
+                if isinstance(volume, dict):
+                    self._add(volume)
+            self._dirty = True
+        if self.snapshot_path and time.monotonic() - self._last_snapshot >= self.snapshot_interval:
+            self.snapshot()
+
+    def _prefix_tokens(self, prefix):
+        start = bisect.bisect_left(self._tokens, prefix)
+        tokens = []
+        for token in self._tokens[start:start + self.MAX_PREFIX_EXPANSION]:
+            if not token.startswith(prefix):
+                break
+            tokens.append(token)
+        return tokens
+
+    # Volumes matching every query token, the last one as a prefix, ranked by
+    # how many tokens hit the title and then by how recently they were seen
+    def search(self, query, limit, offset=0):
+        self.start()
+        tokens = index_tokens(query)
+        if not tokens:
+            return 0, []
+        with self._lock:
+            *complete, last = tokens
+            matches = None
+            for token in complete:
+                postings = self._postings.get(token, set())
+                matches = set(postings) if matches is None else matches & postings
+                if not matches:
+                    return 0, []
+            prefixed = set()
+            last_tokens = self._prefix_tokens(last)
+            for token in last_tokens:
+                prefixed |= self._postings[token]
+            matches = prefixed if matches is None else matches & prefixed
+            if not matches:
+                return 0, []
+            last_tokens = set(last_tokens)
+
+            def score(volume_id):
+                entry = self._volumes[volume_id]
+                title_hits = sum(token in entry.title_tokens for token in complete)
+                title_hits += bool(last_tokens & entry.title_tokens)
+                return (-title_hits, -entry.seq)
+
+            ranked = sorted(matches, key=score)
+            return len(ranked), [self._volumes[volume_id].volume for volume_id in ranked[offset:offset + limit]]
+
+    def snapshot(self):
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            volumes = [entry.volume for entry in self._volumes.values()]
+            self._dirty = False
+            self._last_snapshot = time.monotonic()
+        # Write to a temp file and rename, so a crash never leaves a torn snapshot
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".book-index-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(zlib.compress(app.json.dumps(volumes).encode()))
+            os.replace(temp_path, self.snapshot_path)
+        except OSError as e:
+            app.logger.warning("Could not write book index snapshot: %s", e)
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    # Starts the indexing thread on first use in each process, restoring the
+    # snapshot there so it doesn't slow startup. Nothing runs at import, so
+    # workers forked from a preloading server each get a live thread.
+    def start(self):
+        if self._pid == os.getpid():
+            return
+        with self._executor_lock:
+            if self._pid == os.getpid():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="book-index")
+            self._pending = 0
+            self._pid = os.getpid()
+            if self.snapshot_path:
+                self._executor.submit(self.restore)
+
+    def restore(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                volumes = app.json.loads(zlib.decompress(f.read()))
+        except (OSError, ValueError, zlib.error) as e:
+            app.logger.warning("Could not restore book index snapshot: %s", e)
+            return
+        with self._lock:
+            for volume in volumes[-self.max_volumes:]:
+                self._add(volume)
+
+BOOK_INDEX = BookIndex(
+    BOOK_INDEX_MAX_VOLUMES, BOOK_INDEX_SNAPSHOT_PATH, BOOK_INDEX_SNAPSHOT_INTERVAL, BOOK_INDEX_MAX_PENDING,
+    BOOK_INDEX_SAMPLE_RATE,
+) if BOOK_INDEX_ENABLED else None
+if BOOK_INDEX is not None:
+    atexit.register(BOOK_INDEX.snapshot)
+
 # Volume endpoints
-@app.route("/api/books/search")
-def search_books():
+# Upstream search params and optional field projection from the query string.
+# Raises ValueError for invalid input.
+def search_request_params():
     # Required parameter
     query = request.args.get("q", "")
     if not query:
-        return jsonify({"error": "Query parameter 'q' is required"}), 400
+        raise ValueError("Query parameter 'q' is required")
     
     # Optional parameters with improved defaults
     params = {
@@ -166,145 +2426,587 @@ def search_books():
         if request.args.get(param):
             params[param] = request.args.get(param)
     
-    # Add API key if available
-    if API_KEY:
-        params["key"] = API_KEY
+    # Optional field projection, e.g. fields=card or fields=id,volumeInfo.title
+    field_tree = None
+    if request.args.get("fields"):
+        field_tree = search_field_tree(request.args.get("fields"))
+    return params, field_tree
+
+@app.route("/api/books/search")
+def search_books():
+    try:
+        params, field_tree = search_request_params()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    url = f"{VOLUMES_ENDPOINT}?{urlencode(params)}"
+    cached, status_code = fetch_search(params, field_tree)
+    if (status_code == 429 or status_code >= 500) and BOOK_INDEX is not None:
+        fallback = local_search_response(params, field_tree)
+        if fallback is not None:
+            return fallback
+    if status_code != 200:
+        return jsonify(cached), status_code
+    
+    # Users almost always page forward next
+    if SEARCH_PREFETCH:
+        search_prefetcher.maybe_prefetch(params, field_tree, cached.body)
+    
+    # Add basic caching header
+    return cached_body_response(cached, max_age=300)
+
+# Google's search operators aren't meaningful to the local index
+SEARCH_OPERATOR_PATTERN = re.compile(r"\b(?:intitle|inauthor|inpublisher|subject|isbn|lccn|oclc):", re.IGNORECASE)
+
+# Degraded-mode search answered from the local index when Google fails and
+# there's no stale copy of the page. Returns None if nothing matches.
+def local_search_response(params, field_tree):
+    try:
+        start = max(0, int(params.get("startIndex", 0)))
+        limit = max(1, min(int(params.get("maxResults", 40)), 40))
+    except ValueError:
+        start, limit = 0, 40
+    total, items = BOOK_INDEX.search(SEARCH_OPERATOR_PATTERN.sub(" ", params["q"]), limit, start)
+    if not total:
+        return None
+    data = {"kind": "books#volumes", "totalItems": total, "items": items}
+    if field_tree:
+        data = project_fields(data, field_tree)
+    response = jsonify(data)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Warning"] = '199 - "Results from local index"'
+    response.headers["X-Search-Source"] = "local-index"
+    return response
+
+# Autocomplete over the local index; every token but the last must match a
+# whole word and the last matches as a prefix
+@app.route("/api/books/suggest")
+def suggest_books():
+    query = request.args.get("q", "")
+    if not query.strip():
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    try:
+        limit = max(1, min(int(request.args.get("limit", SUGGEST_MAX_RESULTS)), SUGGEST_MAX_RESULTS))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    
+    items = BOOK_INDEX.search(query, limit)[1] if BOOK_INDEX is not None else []
+    suggestions = []
+    for volume in items:
+        volume_info = volume["volumeInfo"]
+        suggestion = {"id": volume["id"], "title": volume_info["title"]}
+        if volume_info.get("authors"):
+            suggestion["authors"] = volume_info["authors"]
+        thumbnail = volume_info.get("imageLinks", {}).get("smallThumbnail")
+        if thumbnail:
+            suggestion["thumbnail"] = thumbnail
+        suggestions.append(suggestion)
     
+    response = jsonify({"suggestions": suggestions})
+    response.headers["Cache-Control"] = "public, max-age=60"
+    return response
+
+# Deep pagination: fetch up to maxResults results (SEARCH_STREAM_MAX_RESULTS
+# at most) as 40-result pages, SEARCH_STREAM_CONCURRENCY at a time, and
+# stream each page's new volumes as soon as it arrives, skipping IDs already
+# sent. Pages can finish in any order, so each item carries its position in
+# the overall results.
+# format=ndjson (default) or format=sse for EventSource clients.
+@app.route("/api/books/search/stream")
+def stream_search_books():
     try:
-        # Add timeout to prevent long-running requests
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code != 200:
-            return jsonify({
-                "error": f"Google Books API returned an error: {response.status_code}"
-            }), response.status_code
-            
-        data = response.json()
+        params, field_tree = search_request_params()
+        start = int(params["startIndex"])
+        total = int(request.args.get("maxResults", SEARCH_STREAM_MAX_RESULTS))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if start < 0 or total < 1:
+        return jsonify({"error": "startIndex must be >= 0 and maxResults positive"}), 400
+    total = min(total, SEARCH_STREAM_MAX_RESULTS)
+    
+    stream_format = request.args.get("format", "ndjson")
+    if stream_format not in ("ndjson", "sse"):
+        return jsonify({"error": "format must be 'ndjson' or 'sse'"}), 400
+    
+    unsubmitted = deque(range(start, start + total, SEARCH_STREAM_PAGE_SIZE))
+    pages = {}  # future -> page start
+    
+    def submit_page():
+        page_start = unsubmitted.popleft()
+        page_params = dict(params, startIndex=str(page_start), maxResults=str(min(SEARCH_STREAM_PAGE_SIZE, start + total - page_start)))
+        future = SEARCH_STREAM_EXECUTOR.submit(fetch_search, page_params, field_tree)
+        pages[future] = page_start
+        return future
+    
+    pending = {submit_page() for _ in range(min(SEARCH_STREAM_CONCURRENCY, len(unsubmitted)))}
+    
+    if stream_format == "sse":
+        encode = lambda event, data: f"event: {event}\ndata: {app.json.dumps(data)}\n\n"
+    else:
+        encode = lambda event, data: app.json.dumps({"type": event, **data}) + "\n"
+    
+    def generate():
+        seen = set()
+        total_items = None
+        timed_out = "Request to Google Books API timed out"
         
-        # Add basic caching header
-        cache_response = jsonify(data)
-        cache_response.headers["Cache-Control"] = "public, max-age=300"
-        return cache_response
+        # Items of a finished page, or an error event for it
+        def page_events(future):
+            nonlocal total_items
+            page_start = pages[future]
+            if future.exception() is not None:
+                yield encode("error", {"startIndex": page_start, "status": 500, "error": str(future.exception())})
+                return
+            data, status_code = future.result()
+            if status_code != 200:
+                yield encode("error", {"startIndex": page_start, "status": status_code, "error": data.get("error")})
+                return
+            page = app.json.loads(data.body)
+            total_items = page.get("totalItems", total_items)
+            for offset, volume in enumerate(page.get("items") or []):
+                volume_id = volume.get("id")
+                if volume_id is not None:
+                    if volume_id in seen:
+                        continue
+                    seen.add(volume_id)
+                yield encode("item", {"index": page_start + offset, "volume": volume})
         
-    except requests.exceptions.Timeout:
-        return jsonify({"error": "Request to Google Books API timed out"}), 504
-    except requests.exceptions.RequestException as e:
-        return jsonify({"error": f"Error connecting to Google Books API: {str(e)}"}), 502
-    except ValueError as e:  # JSON parsing error
-        return jsonify({"error": "Invalid response from Google Books API"}), 502
+        deadline = time.monotonic() + SEARCH_STREAM_TIMEOUT
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    pending.discard(future)
+                    # Keep the pipeline full before sending this page
+                    if unsubmitted:
+                        pending.add(submit_page())
+                    yield from page_events(future)
+            # Out of time: pages may have finished since the wait gave up; send
+            # those, and report the rest (started or not) as timed out
+            for future in sorted(pending, key=pages.get):
+                if future.done():
+                    yield from page_events(future)
+                else:
+                    future.cancel()
+                    yield encode("error", {"startIndex": pages[future], "status": 504, "error": timed_out})
+            pending.clear()
+            for page_start in unsubmitted:
+                yield encode("error", {"startIndex": page_start, "status": 504, "error": timed_out})
+            yield encode("done", {"count": len(seen), "totalItems": total_items})
+        finally:
+            # The client went away: don't fetch pages nobody will read
+            for future in pending:
+                future.cancel()
+    
+    response = app.response_class(
+        generate(), mimetype="text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # Don't let proxies hold back early results
+    return response
 
-@app.route("/api/books/<volume_id>")
-def get_book_details(volume_id):
+# Cache key for a volume, shared by the detail and batch endpoints
+def volume_cache_key(volume_id, projection=None):
+    return make_cache_key(f"volume:{volume_id}", {"projection": projection} if projection else {})
+
+# Helper function to fetch a single volume, served from cache when possible.
+# Returns (CachedBody, 200) on success or (error dict, status) on failure.
+def fetch_volume(volume_id, projection=None):
     params = {}
+    if projection:
+        params["projection"] = projection
     
-    # Optional projection parameter
-    if request.args.get("projection"):
-        params["projection"] = request.args.get("projection")
+    cache_key = volume_cache_key(volume_id, projection)
+    cached = RESPONSE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached, 200
     
     # Add API key if available
     if API_KEY:
         params["key"] = API_KEY
     
-    url = f"{VOLUMES_ENDPOINT}/{volume_id}"
+    url = f"{VOLUMES_ENDPOINT}/{quote(volume_id, safe='')}"
     if params:
         url += f"?{urlencode(params)}"
     
     try:
         # Add timeout to prevent long-running requests
-        response = requests.get(url, timeout=10)
+        response = upstream_get(url)
         
         if response.status_code == 404:
-            return jsonify({"error": "Book not found"}), 404
+            return {"error": "Book not found"}, 404
         
         if response.status_code != 200:
-            return jsonify({
+            return stale_or_error(cache_key, {
                 "error": f"Google Books API returned an error: {response.status_code}"
-            }), response.status_code
+            }, response.status_code)
             
-        data = response.json()
-        
-        # Add basic caching header
-        cache_response = jsonify(data)
-        cache_response.headers["Cache-Control"] = "public, max-age=3600"  # Cache for 1 hour
-        return cache_response
+        body = upstream_json_body(response)
+        if BOOK_INDEX is not None:
+            BOOK_INDEX.add_body(body)
+        return cache_body(cache_key, body, VOLUME_CACHE_TTL), 200
         
+    except UpstreamUnavailable as e:
+        return stale_or_error(cache_key, {"error": str(e)}, 503)
     except requests.exceptions.Timeout:
-        return jsonify({"error": "Request to Google Books API timed out"}), 504
+        return stale_or_error(cache_key, {"error": "Request to Google Books API timed out"}, 504)
     except requests.exceptions.RequestException as e:
-        return jsonify({"error": f"Error connecting to Google Books API: {str(e)}"}), 502
-    except ValueError as e:  # JSON parsing error
-        return jsonify({"error": "Invalid response from Google Books API"}), 502
+        return stale_or_error(cache_key, {"error": f"Error connecting to Google Books API: {str(e)}"}, 502)
+    except ValueError as e:  # Non-JSON response
+        return stale_or_error(cache_key, {"error": "Invalid response from Google Books API"}, 502)
+
+# Search queries used to find books related to a volume, in priority order:
+# same first author, then same first category
+def related_queries(volume_info):
+    queries = []
+    if volume_info.get("authors"):
+        queries.append(f'inauthor:"{volume_info["authors"][0]}"')
+    if volume_info.get("categories"):
+        queries.append(f'subject:"{volume_info["categories"][0]}"')
+    return queries
+
+# Helper function to find books related to a volume, cached per volume. The
+# author and category searches run concurrently and the first one (in
+# priority order) with results wins.
+def fetch_related(volume_id, volume):
+    cache_key = make_cache_key(f"related:{volume_id}", {})
+    cached = RESPONSE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    futures = [
+        UPSTREAM_EXECUTOR.submit(fetch_search, {
+            "q": query,
+            "startIndex": "0",
+            "maxResults": str(RELATED_MAX_RESULTS + 1),  # One extra in case the volume itself matches
+            "orderBy": "relevance",
+            "printType": "books",
+        }, search_field_tree("card"))
+        for query in related_queries(volume.get("volumeInfo") or {})
+    ]
+    
+    items = []
+    failed = False
+    for future in futures:
+        result, status_code = future.result()
+        if status_code != 200:
+            failed = True
+            continue
+        items = [
+            item for item in app.json.loads(result.body).get("items", [])
+            if item.get("id") != volume_id
+        ][:RELATED_MAX_RESULTS]
+        if items:
+            break
+    
+    body = app.json.dumps({"items": items}).encode()
+    # Don't remember an empty result that was caused by an upstream error
+    if failed and not items:
+        return CachedBody(body, make_etag(body))
+    return cache_body(cache_key, body, RELATED_CACHE_TTL)
+
+@app.route("/api/books/<volume_id>")
+def get_book_details(volume_id):
+    cached, status_code = fetch_volume(volume_id, request.args.get("projection"))
+    if status_code != 200:
+        return jsonify(cached), status_code
+    
+    # Optionally embed related books so the detail page needs one round-trip
+    if "related" in request.args.get("include", "").split(","):
+        volume = app.json.loads(cached.body)
+        related = fetch_related(volume_id, volume)
+        volume["relatedBooks"] = app.json.loads(related.body)["items"]
+        response = jsonify(volume)
+        response.headers["Cache-Control"] = f"public, max-age={min(3600, RELATED_CACHE_TTL)}"
+        if cached.stale_age is not None:
+            mark_stale(response, cached.stale_age)
+        return response
+    
+    # Add basic caching header
+    return cached_body_response(cached, max_age=3600)  # Cache for 1 hour
+
+@app.route("/api/books/<volume_id>/related")
+def get_related_books(volume_id):
+    cached, status_code = fetch_volume(volume_id)
+    if status_code != 200:
+        return jsonify(cached), status_code
+    
+    related = fetch_related(volume_id, app.json.loads(cached.body))
+    return cached_body_response(related, max_age=RELATED_CACHE_TTL)
+
+@app.route("/api/books/batch", methods=["GET", "POST"])
+def get_books_batch():
+    if request.method == "POST":
+        body = request.get_json(silent=True) or {}
+        if not isinstance(body, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        ids = body.get("ids") or []
+        projection = body.get("projection")
+        if not isinstance(ids, list):
+            return jsonify({"error": "'ids' must be a list of volume IDs"}), 400
+    else:
+        ids = request.args.get("ids", "").split(",")
+        projection = request.args.get("projection")
+    
+    # Drop blanks and duplicates while keeping the requested order
+    ids = list(dict.fromkeys(str(volume_id).strip() for volume_id in ids if str(volume_id).strip()))
+    if not ids:
+        return jsonify({"error": "At least one volume ID is required"}), 400
+    if len(ids) > BATCH_MAX_IDS:
+        return jsonify({"error": f"At most {BATCH_MAX_IDS} volume IDs are allowed per batch"}), 400
+    
+    results = {}
+    pending = {}
+    for volume_id in ids:
+        cached = RESPONSE_CACHE.get(volume_cache_key(volume_id, projection))
+        if cached is not None:
+            results[volume_id] = (cached, 200)
+        else:
+            pending[UPSTREAM_EXECUTOR.submit(fetch_volume, volume_id, projection)] = volume_id
+    
+    # Fetch misses concurrently; anything still running at the deadline is
+    # reported as timed out so one slow volume can't hold up the batch
+    if pending:
+        done, not_done = wait(pending, timeout=BATCH_TIMEOUT)
+        for future in done:
+            results[pending[future]] = future.result()
+        for future in not_done:
+            future.cancel()
+            results[pending[future]] = ({"error": "Request to Google Books API timed out"}, 504)
+    
+    # Volume bodies are spliced in as-is rather than decoded and re-encoded
+    items = []
+    for volume_id in ids:
+        data, status_code = results[volume_id]
+        if status_code == 200:
+            head = app.json.dumps({"id": volume_id, "status": status_code})
+            items.append(head[:-1].encode() + b',"volume":' + data.body + b"}")
+        else:
+            items.append(app.json.dumps({"id": volume_id, "status": status_code, "error": data.get("error")}).encode())
+    
+    return json_body_response(b'{"items":[' + b",".join(items) + b"]}")
 
 # Local bookshelf endpoints (for non-authenticated users)
 @app.route("/api/bookshelves")
 def get_local_bookshelves():
     user_id = request.args.get("user_id", "anonymous")
-    bookshelves = get_user_local_bookshelves(user_id)
-    
-    result = []
-    for shelf_id, shelf_data in bookshelves.items():
-        result.append({
-            "id": shelf_id,
-            "name": shelf_data["name"],
-            "bookCount": len(shelf_data["books"])
-        })
-    
-    return jsonify({"items": result})
+    return jsonify({"items": SHELF_STORE.list_shelves(user_id)})
 
 @app.route("/api/bookshelves/<shelf_id>/books")
 def get_local_bookshelf_books(shelf_id):
     user_id = request.args.get("user_id", "anonymous")
-    bookshelves = get_user_local_bookshelves(user_id)
     
-    if shelf_id not in bookshelves:
+    # Optional pagination and sorting parameters
+    sort = request.args.get("sort") or None
+    if sort is not None and sort not in SHELF_SORT_OPTIONS:
+        return jsonify({"error": f"sort must be one of: {', '.join(SHELF_SORT_OPTIONS)}"}), 400
+    
+    order = request.args.get("order", "asc")
+    if order not in ("asc", "desc"):
+        return jsonify({"error": "order must be 'asc' or 'desc'"}), 400
+    
+    limit = None
+    if request.args.get("limit"):
+        try:
+            limit = int(request.args.get("limit"))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        if limit < 1:
+            return jsonify({"error": "limit must be positive"}), 400
+        limit = min(limit, SHELF_PAGE_MAX_LIMIT)
+    
+    cursor = None
+    if request.args.get("cursor"):
+        try:
+            cursor = decode_shelf_cursor(request.args.get("cursor"), sort)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    
+    result = SHELF_STORE.get_books(user_id, shelf_id, limit=limit, cursor=cursor, sort=sort, order=order)
+    if result is None:
         return jsonify({"error": "Bookshelf not found"}), 404
     
-    return jsonify({"books": bookshelves[shelf_id]["books"]})
+    books, next_cursor = result
+    return jsonify({"books": books, "nextCursor": next_cursor})
 
 @app.route("/api/bookshelves/<shelf_id>/books", methods=["POST"])
 def add_book_to_local_bookshelf(shelf_id):
     user_id = request.args.get("user_id", "anonymous")
     data = request.json
     
-    if not data or "volumeInfo" not in data:
+    if not isinstance(data, dict) or "volumeInfo" not in data:
         return jsonify({"error": "Book data is required"}), 400
+    if not isinstance(data["volumeInfo"], dict):
+        return jsonify({"error": "volumeInfo must be an object"}), 400
     
-    bookshelves = get_user_local_bookshelves(user_id)
-    
-    if shelf_id not in bookshelves:
-        return jsonify({"error": "Bookshelf not found"}), 404
-    
-    # Add the book with a timestamp
+    # Add the book with a timestamp. addedAt is kept as a string so both
+    # stores sort it the same way and it round-trips through page cursors.
     book_entry = {
         "id": data.get("id", str(uuid.uuid4())),
-        "addedAt": data.get("addedAt", ""),
+        "addedAt": str(data.get("addedAt") or ""),
         "volumeInfo": data["volumeInfo"]
     }
     
-    # Check if book already exists in shelf
-    book_ids = [book["id"] for book in bookshelves[shelf_id]["books"]]
-    if book_entry["id"] not in book_ids:
-        bookshelves[shelf_id]["books"].append(book_entry)
+    # The store ignores books that are already on the shelf
+    added = SHELF_STORE.add_book(user_id, shelf_id, book_entry)
+    if added is None:
+        return jsonify({"error": "Bookshelf not found"}), 404
+    if BOOK_INDEX is not None:
+        BOOK_INDEX.add_volumes([book_entry])
     
-    return jsonify({"success": True, "bookshelf": bookshelves[shelf_id]})
+    return jsonify({"success": True, "added": added, "bookshelf": SHELF_STORE.get_shelf(user_id, shelf_id)})
 
 @app.route("/api/bookshelves/<shelf_id>/books/<book_id>", methods=["DELETE"])
 def remove_book_from_local_bookshelf(shelf_id, book_id):
     user_id = request.args.get("user_id", "anonymous")
-    bookshelves = get_user_local_bookshelves(user_id)
     
-    if shelf_id not in bookshelves:
+    removed = SHELF_STORE.remove_book(user_id, shelf_id, book_id)
+    if removed is None:
         return jsonify({"error": "Bookshelf not found"}), 404
     
-    # Filter out the book to remove
-    bookshelves[shelf_id]["books"] = [
-        book for book in bookshelves[shelf_id]["books"] 
-        if book["id"] != book_id
-    ]
+    return jsonify({"success": True, "removed": removed})
+
+# Turns one bulk or import operation from the client into a store operation.
+# Raises ValueError for malformed input.
+def parse_shelf_operation(op):
+    if not isinstance(op, dict):
+        raise ValueError("operation must be an object")
+    kind = op.get("op")
+    if kind == "add":
+        book = op.get("book")
+        if not op.get("shelfId") or not isinstance(book, dict) or not isinstance(book.get("volumeInfo"), dict):
+            raise ValueError("add requires shelfId and book.volumeInfo (an object)")
+        book_entry = {
+            "id": str(book.get("id") or uuid.uuid4()),
+            "addedAt": str(book.get("addedAt") or ""),
+            "volumeInfo": book["volumeInfo"]
+        }
+        return ("add", str(op["shelfId"]), book_entry)
+    if kind == "remove":
+        if not op.get("shelfId") or not op.get("bookId"):
+            raise ValueError("remove requires shelfId and bookId")
+        return ("remove", str(op["shelfId"]), str(op["bookId"]))
+    if kind == "move":
+        if not op.get("fromShelfId") or not op.get("toShelfId") or not op.get("bookId"):
+            raise ValueError("move requires fromShelfId, toShelfId and bookId")
+        return ("move", str(op["fromShelfId"]), str(op["toShelfId"]), str(op["bookId"]))
+    raise ValueError("op must be one of: add, remove, move")
+
+def shelf_operation_result(outcome):
+    if outcome is None:
+        return {"status": 404, "error": "Bookshelf not found"}
+    return {"status": 200, "changed": outcome}
+
+# Apply many add/remove/move operations in one request and one transaction.
+# The updated shelf list is returned so the client doesn't have to refetch it.
+@app.route("/api/bookshelves/bulk", methods=["POST"])
+def bulk_update_local_bookshelves():
+    user_id = request.args.get("user_id", "anonymous")
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    
+    ops = data.get("operations")
+    if not isinstance(ops, list) or not ops:
+        return jsonify({"error": "'operations' must be a non-empty list"}), 400
+    if len(ops) > SHELF_BULK_MAX_OPERATIONS:
+        return jsonify({"error": f"At most {SHELF_BULK_MAX_OPERATIONS} operations are allowed per request"}), 400
+    
+    operations = []
+    for index, op in enumerate(ops):
+        try:
+            operations.append(parse_shelf_operation(op))
+        except ValueError as e:
+            return jsonify({"error": f"operations[{index}]: {e}"}), 400
+    
+    outcomes = SHELF_STORE.apply_operations(user_id, operations)
+    if BOOK_INDEX is not None:
+        BOOK_INDEX.add_volumes([operation[2] for operation in operations if operation[0] == "add"])
+    return jsonify({
+        "results": [shelf_operation_result(outcome) for outcome in outcomes],
+        "bookshelves": SHELF_STORE.list_shelves(user_id)
+    })
+
+# Stream every shelf and book as NDJSON, one page of books at a time
+@app.route("/api/bookshelves/export")
+def export_local_bookshelves():
+    user_id = request.args.get("user_id", "anonymous")
+    shelves = SHELF_STORE.list_shelves(user_id)
+    
+    def generate():
+        for shelf in shelves:
+            yield app.json.dumps({"type": "shelf", "id": shelf["id"], "name": shelf["name"]}) + "\n"
+            cursor = None
+            while True:
+                result = SHELF_STORE.get_books(user_id, shelf["id"], limit=SHELF_EXPORT_PAGE_SIZE, cursor=cursor)
+                if result is None:
+                    break
+                books, next_cursor = result
+                for book in books:
+                    yield app.json.dumps({"type": "book", "shelfId": shelf["id"], **book}) + "\n"
+                if next_cursor is None:
+                    break
+                cursor = decode_shelf_cursor(next_cursor, None)
+    
+    response = app.response_class(generate(), mimetype="application/x-ndjson")
+    # user_id is client input: a sanitized ASCII name, plus the exact one per RFC 5987
+    filename = f"bookshelves-{user_id}.ndjson"
+    fallback = re.sub(r"[^A-Za-z0-9._-]", "_", filename)
+    response.headers["Content-Disposition"] = f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+    return response
+
+# Import NDJSON in the export format. The body is read line by line and
+# applied in batches, so large libraries are never held in memory. Shelf
+# lines are accepted but shelves are not created; books for unknown shelves
+# are counted as skipped.
+@app.route("/api/bookshelves/import", methods=["POST"])
+def import_local_bookshelves():
+    user_id = request.args.get("user_id", "anonymous")
+    counts = {"imported": 0, "duplicates": 0, "skipped": 0}
+    errors = []
+    batch = []
+    
+    def flush():
+        if BOOK_INDEX is not None:
+            BOOK_INDEX.add_volumes([operation[2] for operation in batch])
+        for outcome in SHELF_STORE.apply_operations(user_id, batch):
+            if outcome is None:
+                counts["skipped"] += 1
+            elif outcome:
+                counts["imported"] += 1
+            else:
+                counts["duplicates"] += 1
+        batch.clear()
     
-    return jsonify({"success": True})
+    line_number = 0
+    while True:
+        line = request.stream.readline(SHELF_IMPORT_MAX_LINE_BYTES + 1)
+        if not line:
+            break
+        line_number += 1
+        if len(line) > SHELF_IMPORT_MAX_LINE_BYTES:
+            return jsonify({"error": f"line {line_number} is longer than {SHELF_IMPORT_MAX_LINE_BYTES} bytes", **counts}), 413
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("line must be a JSON object")
+            if record.get("type") == "shelf":
+                continue
+            batch.append(parse_shelf_operation({"op": "add", "shelfId": record.get("shelfId"), "book": record}))
+        except ValueError as e:
+            counts["skipped"] += 1
+            if len(errors) < 20:
+                errors.append({"line": line_number, "error": str(e)})
+            continue
+        if len(batch) >= SHELF_IMPORT_BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+    
+    return jsonify({**counts, "errors": errors, "bookshelves": SHELF_STORE.list_shelves(user_id)})
 
 # Public bookshelf endpoints (Google Books API)
 @app.route("/api/users/<user_id>/bookshelves")
@@ -325,8 +3027,7 @@ def get_user_bookshelves(user_id):
     if params:
         url += f"?{urlencode(params)}"
     
-    data, status_code = make_api_request(url)
-    return jsonify(data), status_code
+    return proxy_api_request(url)
 
 @app.route("/api/users/<user_id>/bookshelves/<shelf_id>")
 def get_user_bookshelf(user_id, shelf_id):
@@ -340,8 +3041,7 @@ def get_user_bookshelf(user_id, shelf_id):
     if params:
         url += f"?{urlencode(params)}"
     
-    data, status_code = make_api_request(url)
-    return jsonify(data), status_code
+    return proxy_api_request(url)
 
 @app.route("/api/users/<user_id>/bookshelves/<shelf_id>/volumes")
 def get_user_bookshelf_volumes(user_id, shelf_id):
@@ -365,8 +3065,199 @@ def get_user_bookshelf_volumes(user_id, shelf_id):
     if params:
         url += f"?{urlencode(params)}"
     
-    data, status_code = make_api_request(url)
-    return jsonify(data), status_code
+    return proxy_api_request(url)
+
+# Per-user cache of My Library responses, kept in step with the user's own
+# writes. Each user's shelf list and each shelf's volume lists carry a
+# generation number in their cache key; bumping it drops every cached page of
+# that list at once. When the unpaginated volume list of a shelf is cached in
+# full, writes are applied to the cached bodies instead (counts in the shelf
+# list, removals from the volume list), so the refresh that follows a write
+# is served locally.
+class LibraryCache:
+    def __init__(self, cache, ttl, generations):
+        self.cache = cache
+        self.ttl = ttl
+        self.generations = generations
+
+    def _generation(self, identity, shelf_id, bump=False):
+        return self.generations.get(identity, shelf_id, bump)
+
+    def shelves_key(self, identity, params):
+        return ("library", identity, self._generation(identity, None), make_cache_key("shelves", params))
+
+    def volumes_key(self, identity, shelf_id, params):
+        return ("library", identity, self._generation(identity, shelf_id), make_cache_key(f"volumes:{shelf_id}", params))
+
+    # Decoded cached body with its remaining TTL, without touching hit metrics
+    def _load(self, key):
+        entry = self.cache.lookup(key)
+        if entry is None:
+            return None
+        cached, expires_in = entry
+        return app.json.loads(cached.body), expires_in
+
+    def _store(self, key, data, ttl):
+        body = app.json.dumps(data).encode()
+        self.cache.set(key, CachedBody(body, make_etag(body)), ttl, len(body))
+
+    # IDs on a shelf, if its complete volume list is cached
+    def _shelf_volumes(self, identity, shelf_id):
+        loaded = self._load(self.volumes_key(identity, shelf_id, {}))
+        if loaded is None:
+            return None
+        data, expires_in = loaded
+        items = data.get("items") or []
+        if len(items) != data.get("totalItems", 0):
+            return None
+        return data, expires_in, {item.get("id") for item in items}
+
+    # Applies change(volumeCount) to the shelf in the cached default shelf
+    # list; if that can't be done exactly, every cached shelf list is dropped
+    def _update_count(self, identity, shelf_id, change):
+        loaded = self._load(self.shelves_key(identity, {})) if change else None
+        self._generation(identity, None, bump=True)
+        if loaded is None:
+            return
+        data, expires_in = loaded
+        for shelf in data.get("items") or []:
+            if str(shelf.get("id")) == shelf_id:
+                shelf["volumeCount"] = change(shelf.get("volumeCount", 0))
+                self._store(self.shelves_key(identity, {}), data, expires_in)
+                return
+
+    def volume_added(self, identity, shelf_id, volume_id):
+        known = self._shelf_volumes(identity, shelf_id)
+        if known is not None and volume_id in known[2]:
+            return
+        # Google decides where the volume appears in the list, so it is refetched
+        self._generation(identity, shelf_id, bump=True)
+        self._update_count(identity, shelf_id, (lambda count: count + 1) if known is not None else None)
+
+    def volume_removed(self, identity, shelf_id, volume_id):
+        known = self._shelf_volumes(identity, shelf_id)
+        if known is not None and volume_id not in known[2]:
+            return
+        self._generation(identity, shelf_id, bump=True)
+        if known is None:
+            self._update_count(identity, shelf_id, None)
+            return
+        data, expires_in, _ = known
+        data["items"] = [item for item in data["items"] if item.get("id") != volume_id]
+        data["totalItems"] = len(data["items"])
+        if not data["items"]:
+            del data["items"]
+        self._store(self.volumes_key(identity, shelf_id, {}), data, expires_in)
+        self._update_count(identity, shelf_id, lambda count: max(0, count - 1))
+
+    # Drops a shelf's cached volumes and the shelf lists after a change whose
+    # outcome isn't known
+    def shelf_changed(self, identity, shelf_id):
+        self._generation(identity, shelf_id, bump=True)
+        self._generation(identity, None, bump=True)
+
+    def shelf_cleared(self, identity, shelf_id):
+        self._generation(identity, shelf_id, bump=True)
+        self._store(self.volumes_key(identity, shelf_id, {}), {"kind": "books#volumes", "totalItems": 0}, self.ttl)
+        self._update_count(identity, shelf_id, lambda count: 0)
+
+# LibraryCache generations kept in this process. They come from one counter,
+# so a forgotten generation is replaced by a new one and can never revive
+# old entries.
+class MemoryLibraryGenerations:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._generations = OrderedDict()  # (identity, shelf_id or None) -> generation
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get(self, identity, shelf_id, bump=False):
+        key = (identity, shelf_id)
+        with self._lock:
+            generation = self._generations.get(key)
+            if generation is None or bump:
+                generation = self._generations[key] = next(self._counter)
+            self._generations.move_to_end(key)
+            while len(self._generations) > self.max_entries:
+                self._generations.popitem(last=False)
+            return generation
+
+# LibraryCache generations in a SQLite file shared by every worker process.
+# Bumps are committed before the write's response is sent, so the next
+# request sees them whichever worker handles it. A list without a row is at
+# generation "0" and bumps pick random tokens; a row is only pruned long
+# after every entry stored under its generation or under "0" has expired.
+class SQLiteLibraryGenerations(SQLiteDatabase):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS library_generations (
+            identity TEXT NOT NULL,
+            shelf_id TEXT NOT NULL,  -- '' for the shelf list
+            generation TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (identity, shelf_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS library_generations_updated_at ON library_generations (updated_at);
+    """
+
+    # Covers a slow upstream fetch that stores under the old generation
+    PRUNE_GRACE = 3600
+
+    def __init__(self, path, ttl):
+        super().__init__(path)
+        self.ttl = ttl
+        self._connection().executescript(self.SCHEMA)
+
+    def get(self, identity, shelf_id, bump=False):
+        shelf_id = shelf_id if shelf_id is not None else ""
+        if not bump:
+            row = self._connection().execute(
+                "SELECT generation FROM library_generations WHERE identity = ? AND shelf_id = ?",
+                (identity, shelf_id),
+            ).fetchone()
+            return row[0] if row else "0"
+        generation = secrets.token_hex(8)
+        now = time.time()
+        with self._write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO library_generations (identity, shelf_id, generation, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (identity, shelf_id, generation, now),
+            )
+            conn.execute(
+                "DELETE FROM library_generations WHERE updated_at < ?", (now - self.ttl - self.PRUNE_GRACE,)
+            )
+        return generation
+
+def create_library_cache():
+    backend = LIBRARY_CACHE_BACKEND
+    if backend == "auto":
+        backend = "sqlite" if RESPONSE_CACHE_BACKEND == "sqlite" else "off"
+    if backend == "sqlite":
+        return LibraryCache(
+            SQLiteResponseCache(LIBRARY_CACHE_DB_PATH, LIBRARY_CACHE_MAX_ENTRIES, LIBRARY_CACHE_MAX_BYTES, name="library"),
+            LIBRARY_CACHE_TTL,
+            SQLiteLibraryGenerations(LIBRARY_CACHE_DB_PATH, LIBRARY_CACHE_TTL),
+        )
+    # With "off" nothing is stored, so every request goes upstream as before
+    enabled = backend == "memory"
+    return LibraryCache(
+        ResponseCache(LIBRARY_CACHE_MAX_ENTRIES, LIBRARY_CACHE_MAX_BYTES, name="library" if enabled else None),
+        LIBRARY_CACHE_TTL if enabled else 0,
+        MemoryLibraryGenerations(LIBRARY_CACHE_MAX_ENTRIES),
+    )
+
+LIBRARY_CACHE = create_library_cache()
+
+# Cache identity for the signed-in user: the Google account ID, or the token
+# if the profile wasn't fetched
+def library_identity():
+    user_id = (session.get('user_info') or {}).get('id')
+    if user_id:
+        return f"user:{user_id}"
+    return "token:" + hashlib.sha256(session['access_token'].encode()).hexdigest()
+
+def response_status(rv):
+    return rv[1] if isinstance(rv, tuple) else rv.status_code
 
 # "My Library" endpoints (authenticated)
 @app.route("/api/mylibrary/bookshelves")
@@ -380,6 +3271,8 @@ def get_my_bookshelves():
     if request.args.get("maxResults"):
         params["maxResults"] = request.args.get("maxResults")
     
+    cache_key = LIBRARY_CACHE.shelves_key(library_identity(), params)
+    
     # Add API key if available
     if API_KEY:
         params["key"] = API_KEY
@@ -388,8 +3281,7 @@ def get_my_bookshelves():
     if params:
         url += f"?{urlencode(params)}"
     
-    data, status_code = make_api_request(url)
-    return jsonify(data), status_code
+    return proxy_api_request(url, cache=LIBRARY_CACHE.cache, cache_key=cache_key, ttl=LIBRARY_CACHE.ttl)
 
 @app.route("/api/mylibrary/bookshelves/<shelf_id>/volumes")
 @login_required
@@ -406,6 +3298,8 @@ def get_my_bookshelf_volumes(shelf_id):
     if request.args.get("projection"):
         params["projection"] = request.args.get("projection")
     
+    cache_key = LIBRARY_CACHE.volumes_key(library_identity(), shelf_id, params)
+    
     # Add API key if available
     if API_KEY:
         params["key"] = API_KEY
@@ -414,8 +3308,7 @@ def get_my_bookshelf_volumes(shelf_id):
     if params:
         url += f"?{urlencode(params)}"
     
-    data, status_code = make_api_request(url)
-    return jsonify(data), status_code
+    return proxy_api_request(url, cache=LIBRARY_CACHE.cache, cache_key=cache_key, ttl=LIBRARY_CACHE.ttl)
 
 @app.route("/api/mylibrary/bookshelves/<shelf_id>/addVolume", methods=["POST"])
 @login_required
@@ -432,8 +3325,10 @@ def add_volume_to_my_bookshelf(shelf_id):
     
     url = f"{MY_LIBRARY_ENDPOINT}/{shelf_id}/addVolume?{urlencode(params)}"
     
-    data, status_code = make_api_request(url, method="POST")
-    return jsonify(data), status_code
+    rv = proxy_api_request(url, method="POST")
+    if response_status(rv) < 400:
+        LIBRARY_CACHE.volume_added(library_identity(), shelf_id, volume_id)
+    return rv
 
 @app.route("/api/mylibrary/bookshelves/<shelf_id>/removeVolume", methods=["POST"])
 @login_required
@@ -450,8 +3345,10 @@ def remove_volume_from_my_bookshelf(shelf_id):
     
     url = f"{MY_LIBRARY_ENDPOINT}/{shelf_id}/removeVolume?{urlencode(params)}"
     
-    data, status_code = make_api_request(url, method="POST")
-    return jsonify(data), status_code
+    rv = proxy_api_request(url, method="POST")
+    if response_status(rv) < 400:
+        LIBRARY_CACHE.volume_removed(library_identity(), shelf_id, volume_id)
+    return rv
 
 @app.route("/api/mylibrary/bookshelves/<shelf_id>/clearVolumes", methods=["POST"])
 @login_required
@@ -466,8 +3363,97 @@ def clear_my_bookshelf(shelf_id):
     if params:
         url += f"?{urlencode(params)}"
     
-    data, status_code = make_api_request(url, method="POST")
-    return jsonify(data), status_code
+    rv = proxy_api_request(url, method="POST")
+    if response_status(rv) < 400:
+        LIBRARY_CACHE.shelf_cleared(library_identity(), shelf_id)
+    return rv
+
+def my_library_volume_url(shelf_id, action, volume_id):
+    params = {"volumeId": volume_id}
+    if API_KEY:
+        params["key"] = API_KEY
+    return f"{MY_LIBRARY_ENDPOINT}/{quote(shelf_id, safe='')}/{action}?{urlencode(params)}"
+
+# Run one volume's operations in order; a move is an add to the target shelf
+# followed by a remove from the source, and stops if the add fails
+def run_my_library_operations(volume_ops, headers):
+    results = []
+    for op in volume_ops:
+        if op["op"] == "move":
+            steps = [(op["toShelfId"], "addVolume"), (op["fromShelfId"], "removeVolume")]
+        else:
+            steps = [(op["shelfId"], "addVolume" if op["op"] == "add" else "removeVolume")]
+        for shelf_id, action in steps:
+            data, status_code = make_api_request(my_library_volume_url(shelf_id, action, op["volumeId"]), "POST", headers=headers)
+            if status_code >= 400:
+                break
+        result = {"status": status_code}
+        if status_code >= 400:
+            result["error"] = (data.get("error") if isinstance(data, dict) else None) or "Request failed"
+        results.append(result)
+    return results
+
+# Apply many add/remove/move operations to the user's Google library.
+# Operations on the same volume run in order; different volumes are sent
+# concurrently, at most MYLIBRARY_BULK_CONCURRENCY at a time per request.
+@app.route("/api/mylibrary/bookshelves/bulk", methods=["POST"])
+@login_required
+def bulk_update_my_bookshelves():
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    
+    ops = data.get("operations")
+    if not isinstance(ops, list) or not ops:
+        return jsonify({"error": "'operations' must be a non-empty list"}), 400
+    if len(ops) > SHELF_BULK_MAX_OPERATIONS:
+        return jsonify({"error": f"At most {SHELF_BULK_MAX_OPERATIONS} operations are allowed per request"}), 400
+    
+    by_volume = OrderedDict()
+    for index, op in enumerate(ops):
+        required = ("fromShelfId", "toShelfId") if isinstance(op, dict) and op.get("op") == "move" else ("shelfId",)
+        if (
+            not isinstance(op, dict)
+            or op.get("op") not in ("add", "remove", "move")
+            or not op.get("volumeId")
+            or not all(op.get(field) for field in required)
+        ):
+            return jsonify({"error": f"operations[{index}]: expected op add/remove with shelfId and volumeId, or move with fromShelfId, toShelfId and volumeId"}), 400
+        op = {key: str(value) for key, value in op.items() if key in ("op", "shelfId", "fromShelfId", "toShelfId", "volumeId")}
+        by_volume.setdefault(op["volumeId"], []).append((index, op))
+    
+    headers = auth_headers()
+    results = [None] * len(ops)
+    groups = iter(by_volume.values())
+    pending = {}
+    while True:
+        for group in itertools.islice(groups, MYLIBRARY_BULK_CONCURRENCY - len(pending)):
+            future = UPSTREAM_EXECUTOR.submit(run_my_library_operations, [op for _, op in group], headers)
+            pending[future] = [index for index, _ in group]
+        if not pending:
+            break
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            for index, result in zip(pending.pop(future), future.result()):
+                results[index] = result
+    
+    # A failed move may still have completed its add, so both shelves are
+    # dropped from the cache
+    identity = library_identity()
+    for op, result in zip(ops, results):
+        if result["status"] >= 400:
+            if op["op"] == "move":
+                LIBRARY_CACHE.shelf_changed(identity, str(op["toShelfId"]))
+                LIBRARY_CACHE.shelf_changed(identity, str(op["fromShelfId"]))
+        elif op["op"] == "add":
+            LIBRARY_CACHE.volume_added(identity, str(op["shelfId"]), str(op["volumeId"]))
+        elif op["op"] == "remove":
+            LIBRARY_CACHE.volume_removed(identity, str(op["shelfId"]), str(op["volumeId"]))
+        else:
+            LIBRARY_CACHE.volume_added(identity, str(op["toShelfId"]), str(op["volumeId"]))
+            LIBRARY_CACHE.volume_removed(identity, str(op["fromShelfId"]), str(op["volumeId"]))
+    
+    return jsonify({"results": results})
 
 @app.route("/api/health")
 def health_check():
@@ -477,6 +3463,20 @@ def health_check():
         "oauth_configured": bool(GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET)
     })
 
+@app.route("/api/metrics")
+def metrics_endpoint():
+    gauges = {
+        "bookfinder_upstream_in_flight": [((), upstream_pressure.in_flight)],
+        "bookfinder_circuit_open": [
+            ((("endpoint", name),), int(breaker.state != CircuitBreaker.CLOSED))
+            for name, breaker in UPSTREAM_BREAKERS.items()
+        ],
+    }
+    # In-flight requests are tracked as a counter of +1/-1 updates
+    counters, _ = metrics.snapshot()
+    gauges["bookfinder_http_requests_in_flight"] = [((), counters.get(("bookfinder_http_requests_in_flight", ()), 0))]
+    return app.response_class(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
+
 @app.route("/api/docs")
 def api_docs():
     # Simple API documentation
@@ -485,12 +3485,32 @@ def api_docs():
             "/api/books/search": {
                 "methods": ["GET"],
                 "description": "Search for books",
-                "query_params": ["q (required)", "startIndex", "maxResults", "orderBy", "filter", "printType", "projection", "download", "langRestrict"]
+                "query_params": ["q (required)", "startIndex", "maxResults", "orderBy", "filter", "printType", "projection", "download", "langRestrict", "fields (card or comma-separated paths)"]
+            },
+            "/api/books/suggest": {
+                "methods": ["GET"],
+                "description": "Autocomplete titles from books seen by this server",
+                "query_params": ["q", "limit"]
+            },
+            "/api/books/search/stream": {
+                "methods": ["GET"],
+                "description": "Stream up to maxResults search results as NDJSON or SSE, fetching pages concurrently",
+                "query_params": ["q", "startIndex", "maxResults", "orderBy", "printType", "filter", "projection", "download", "langRestrict", "fields", "format"]
             },
             "/api/books/<volume_id>": {
                 "methods": ["GET"],
                 "description": "Get specific volume details",
-                "query_params": ["projection"]
+                "query_params": ["projection", "include (related)"]
+            },
+            "/api/books/<volume_id>/related": {
+                "methods": ["GET"],
+                "description": "Get books related to a volume by author or category",
+                "query_params": []
+            },
+            "/api/books/batch": {
+                "methods": ["GET", "POST"],
+                "description": "Get details for many volumes at once (POST body: {\"ids\": [...]})",
+                "query_params": ["ids (comma-separated)", "projection"]
             }
         },
         "Local Bookshelf Endpoints": {
@@ -502,12 +3522,28 @@ def api_docs():
             "/api/bookshelves/<shelf_id>/books": {
                 "methods": ["GET", "POST"],
                 "description": "Get or add books to a local bookshelf",
-                "query_params": ["user_id"]
+                "query_params": ["user_id", "limit", "cursor", "sort (addedAt, title)", "order (asc, desc)"]
             },
             "/api/bookshelves/<shelf_id>/books/<book_id>": {
                 "methods": ["DELETE"],
                 "description": "Remove a book from a local bookshelf",
                 "query_params": ["user_id"]
+            },
+            "/api/bookshelves/bulk": {
+                "methods": ["POST"],
+                "description": "Apply many add/remove/move operations in one transaction",
+                "query_params": ["user_id"],
+                "body": {"operations": [{"op": "add|remove|move", "shelfId": "", "book": {}, "bookId": "", "fromShelfId": "", "toShelfId": ""}]}
+            },
+            "/api/bookshelves/export": {
+                "methods": ["GET"],
+                "description": "Stream all local shelves and books as NDJSON",
+                "query_params": ["user_id"]
+            },
+            "/api/bookshelves/import": {
+                "methods": ["POST"],
+                "description": "Import books from an NDJSON export",
+                "query_params": ["user_id"]
             }
         },
         "Public Bookshelf Endpoints": {
@@ -528,6 +3564,11 @@ def api_docs():
             }
         },
         "My Library Endpoints (Requires Authentication)": {
+            "/api/mylibrary/bookshelves/bulk": {
+                "methods": ["POST"],
+                "description": "Apply many add/remove/move operations to the user's Google bookshelves",
+                "body": {"operations": [{"op": "add|remove|move", "shelfId": "", "fromShelfId": "", "toShelfId": "", "volumeId": ""}]}
+            },
             "/api/mylibrary/bookshelves": {
                 "methods": ["GET"],
                 "description": "Get authenticated user's bookshelves",
@@ -577,6 +3618,10 @@ def api_docs():
                 "methods": ["GET"],
                 "description": "Health check endpoint"
             },
+            "/api/metrics": {
+                "methods": ["GET"],
+                "description": "Prometheus metrics"
+            },
             "/api/docs": {
                 "methods": ["GET"],
                 "description": "This API documentation"
@@ -23,7 +23,8 @@ export default function BookDetail() {
       setError(null)
       
       try {
-        const response = await fetch(`/api/books/${id}`)
+        // Related books are resolved server-side in the same request
+        const response = await fetch(`/api/books/${id}?include=related`)
         
         if (!response.ok) {
           throw new Error(`Error ${response.status}: ${response.statusText}`)
@@ -35,12 +36,9 @@ export default function BookDetail() {
           setError(data.error)
           setBook(null)
         } else {
-          setBook(data)
-          
-          // After getting book details, fetch related books by author or category
-          if (data.volumeInfo.authors?.length > 0 || data.volumeInfo.categories?.length > 0) {
-            fetchRelatedBooks(data)
-          }
+          const { relatedBooks, ...volume } = data
+          setBook(volume)
+          setRelatedBooks(relatedBooks || [])
         }
       } catch (err) {
         console.error('Error fetching book details:', err)
@@ -54,38 +52,6 @@ export default function BookDetail() {
     fetchBookDetails()
   }, [id])
   
-  // Fetch related books based on author or category
-  async function fetchRelatedBooks(bookData: Book) {
-    try {
-      let query = ''
-      
-      // Prefer to search by first author
-      if (bookData.volumeInfo.authors?.length > 0) {
-        query = `inauthor:"${bookData.volumeInfo.authors[0]}"`
-      } 
-      // Fall back to first category
-      else if (bookData.volumeInfo.categories?.length > 0) {
-        query = `subject:"${bookData.volumeInfo.categories[0]}"`
-      }
-      
-      if (query) {
-        const response = await fetch(`/api/books/search?q=${encodeURIComponent(query)}&maxResults=6`)
-        const data = await response.json()
-        
-        if (data.items) {
-          // Filter out the current book and limit to 5 books
-          setRelatedBooks(
-            data.items
-              .filter((item: Book) => item.id !== bookData.id)
-              .slice(0, 5)
-          )
-        }
-      }
-    } catch (err) {
-      console.error('Error fetching related books:', err)
-    }
-  }
-
   const handleGoBack = () => {
     router.back()
   }
@@ -37,7 +37,7 @@ export default function Home() {
     router.push(`/?q=${encodeURIComponent(query)}`, { scroll: false })
     
     try {
-      const response = await fetch(`/api/books/search?q=${encodeURIComponent(query)}&maxResults=40`)
+      const response = await fetch(`/api/books/search?q=${encodeURIComponent(query)}&maxResults=40&fields=card`)
       
       if (!response.ok) {
         throw new Error(`Error ${response.status}: ${response.statusText}`)
@@ -0,0 +1,131 @@
+"""Cold-start cost of the serverless entry point.
+
+Each run starts a fresh interpreter that imports ``api/index.py`` and serves
+one request through the Flask test client, the way a new serverless instance
+would. Upstream calls go to ``fake_google_books`` with no added latency, so
+the first-request time is our own work (connection setup, first use of lazy
+state) rather than Google's.
+
+    python benchmarks/bench_cold_start.py --runs 10
+    python benchmarks/bench_cold_start.py --json before.json
+    python benchmarks/bench_cold_start.py --compare before.json
+    python benchmarks/bench_cold_start.py --importtime 15
+
+App settings are taken from the environment, e.g. WARM_STATE_PATH to measure
+a start from a warm-state snapshot.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import fake_google_books
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(HERE, "..", "api")
+
+PATHS = {
+    "search": "/api/books/search?q=cold+start&fields=card",
+    "detail": "/api/books/vol00042",
+    "health": "/api/health",
+}
+
+# Runs in the child interpreter; prints timings in milliseconds as JSON
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import index
+imported = time.perf_counter()
+response = index.app.test_client().get(sys.argv[1])
+assert response.status_code == 200, response.status_code
+done = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "first_request_ms": (done - imported) * 1000}))
+"""
+
+
+def run_once(path, env):
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, path], cwd=API_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        "median": statistics.median(values),
+        "p95": values[min(len(values) - 1, int(0.95 * len(values)))],
+        "min": values[0],
+    }
+
+
+def print_importtime(env, top):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import index"], cwd=API_DIR, env=env, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nesting is shown by two spaces per level; keep what index imports directly
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if cumulative.strip().isdigit() and depth == 1:
+            rows.append((int(cumulative), name.strip()))
+    print("\nslowest imports made by index.py (cumulative ms):")
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:>8.1f}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters per endpoint")
+    parser.add_argument("--endpoints", default="search,detail,health", help=f"comma-separated: {', '.join(PATHS)}")
+    parser.add_argument("--importtime", type=int, metavar="N", default=0, help="also list the N slowest imports")
+    parser.add_argument("--json", metavar="PATH", help="write results to PATH")
+    parser.add_argument("--compare", metavar="PATH", help="show changes against results saved with --json")
+    args = parser.parse_args()
+
+    fake = fake_google_books.FakeGoogleBooks(latency_ms=0)
+    server = fake_google_books.start_server(fake)
+    env = dict(os.environ)
+    env["GOOGLE_BOOKS_API_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}{fake_google_books.BASE_PATH}"
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print(f"{args.runs} cold starts per endpoint")
+    print(f"{'endpoint':<10}{'import p50':>12}{'p95':>8}{'first req p50':>15}{'p95':>8}{'total p50':>11}")
+    report = {}
+    run_once(PATHS["health"], env)  # Make sure bytecode is compiled before timing
+    for name in args.endpoints.split(","):
+        samples = [run_once(PATHS[name], env) for _ in range(args.runs)]
+        result = {
+            "import_ms": summarize([sample["import_ms"] for sample in samples]),
+            "first_request_ms": summarize([sample["first_request_ms"] for sample in samples]),
+            "total_ms": summarize([sample["import_ms"] + sample["first_request_ms"] for sample in samples]),
+        }
+        report[name] = result
+        row = (f"{name:<10}{result['import_ms']['median']:>12.1f}{result['import_ms']['p95']:>8.1f}"
+               f"{result['first_request_ms']['median']:>15.1f}{result['first_request_ms']['p95']:>8.1f}"
+               f"{result['total_ms']['median']:>11.1f}")
+        if name in baseline:
+            before = baseline[name]["total_ms"]["median"]
+            row += f"   total {(result['total_ms']['median'] - before) / before * 100:+.0f}%"
+        print(row)
+
+    if args.importtime:
+        print_importtime(env, args.importtime)
+
+    server.shutdown()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Mixed-workload load test against a local Google Books stand-in.
+
+Starts ``fake_google_books`` in-process, then for each ``WORKERSxTHREADS``
+configuration launches the app (``serve_app.py``, or gunicorn with
+``--server gunicorn``) pointed at it through ``GOOGLE_BOOKS_API_BASE_URL``,
+drives a weighted mix of searches, volume details and local shelf mutations
+from ``--concurrency`` client threads, and reports throughput and
+p50/p95/p99 latency per configuration and per operation.
+
+    python benchmarks/bench_load.py --configs 1x4,1x16,4x4 --duration 15
+    python benchmarks/bench_load.py --json before.json
+    python benchmarks/bench_load.py --compare before.json
+
+App settings such as UPSTREAM_HEDGING or RESPONSE_CACHE_TTL are taken from the
+environment, so the same run can be repeated with a feature on and off.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+import fake_google_books
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SHELF_ID = "to-read"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("search", "detail", "shelf"):
+            raise argparse.ArgumentTypeError(f"unknown operation: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def parse_configs(text):
+    configs = []
+    for part in text.split(","):
+        workers, _, threads = part.lower().partition("x")
+        configs.append((int(workers), int(threads)))
+    return configs
+
+
+def start_app(server, workers, threads, port, env):
+    if server == "gunicorn":
+        command = [
+            sys.executable, "-m", "gunicorn", "--preload", "-w", str(workers), "--threads", str(threads),
+            "-b", f"127.0.0.1:{port}", "--chdir", os.path.join(HERE, "..", "api"), "index:app",
+        ]
+    else:
+        command = [
+            sys.executable, os.path.join(HERE, "serve_app.py"),
+            "--port", str(port), "--workers", str(workers), "--threads", str(threads),
+        ]
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app exited with code {process.returncode}: {' '.join(command)}")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("app did not start within 30s")
+
+
+class Client:
+    def __init__(self, base_url, args, seed):
+        self.base_url = base_url
+        self.args = args
+        self.random = random.Random(seed)
+        self.user_id = f"bench-{seed}"
+        self.shelved = []
+
+    def pick(self, mix):
+        roll = self.random.uniform(0, sum(mix.values()))
+        for name, weight in mix.items():
+            roll -= weight
+            if roll <= 0:
+                return name
+        return name
+
+    def request(self, name):
+        args = self.args
+        if name == "search":
+            query = f"topic{self.random.randrange(args.queries)}"
+            page = min(int(self.random.expovariate(1.0)), 4)
+            return "search", "GET", f"/api/books/search?q={query}&startIndex={page * 20}&maxResults=20&fields=card", None
+        if name == "detail":
+            volume_id = f"vol{self.random.randrange(args.volumes):05d}"
+            return "detail", "GET", f"/api/books/{volume_id}", None
+        # Keep each client's shelf bounded: add until it holds a few books, then remove
+        if len(self.shelved) < 10 or self.random.random() < 0.5 and len(self.shelved) < 50:
+            volume = fake_google_books.make_volume(self.random.randrange(args.volumes), 200)
+            self.shelved.append(volume["id"])
+            body = {"id": volume["id"], "volumeInfo": volume["volumeInfo"]}
+            return "shelf_add", "POST", f"/api/bookshelves/{SHELF_ID}/books?user_id={self.user_id}", body
+        volume_id = self.shelved.pop(self.random.randrange(len(self.shelved)))
+        return "shelf_remove", "DELETE", f"/api/bookshelves/{SHELF_ID}/books/{volume_id}?user_id={self.user_id}", None
+
+    def run(self, mix, deadline, results):
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            operation, method, path, body = self.request(self.pick(mix))
+            started = time.perf_counter()
+            try:
+                response = session.request(method, self.base_url + path, json=body, timeout=30)
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            results.append((operation, time.perf_counter() - started, ok))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(latency for _, latency, _ in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, _, ok in samples if not ok),
+        "rps": len(samples) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run_config(args, workers, threads, upstream_url):
+    port = free_port()
+    data_dir = tempfile.mkdtemp(prefix="bookfinder-bench-")
+    env = dict(os.environ)
+    env.update({
+        "GOOGLE_BOOKS_API_BASE_URL": upstream_url,
+        "SHELF_DB_PATH": os.path.join(data_dir, "shelves.db"),
+        "FLASK_SECRET_KEY": "bench",
+    })
+    # The quota scheduler would otherwise cap upstream calls at 20/s
+    env.setdefault("UPSTREAM_RATE", "0")
+    process = start_app(args.server, workers, threads, port, env)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        results = []
+        clients = [Client(base_url, args, seed) for seed in range(args.concurrency)]
+        if args.warmup:
+            deadline = time.monotonic() + args.warmup
+            warmup = [threading.Thread(target=c.run, args=(args.mix, deadline, [])) for c in clients]
+            for thread in warmup:
+                thread.start()
+            for thread in warmup:
+                thread.join()
+        started = time.monotonic()
+        deadline = started + args.duration
+        runners = [threading.Thread(target=c.run, args=(args.mix, deadline, results)) for c in clients]
+        for thread in runners:
+            thread.start()
+        for thread in runners:
+            thread.join()
+        elapsed = time.monotonic() - started
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    by_operation = defaultdict(list)
+    for sample in results:
+        by_operation[sample[0]].append(sample)
+    return {
+        "total": summarize(results, elapsed),
+        "operations": {name: summarize(samples, elapsed) for name, samples in sorted(by_operation.items())},
+    }
+
+
+def print_row(label, stats, baseline=None):
+    row = (f"{label:<20}{stats['requests']:>9}{stats['errors']:>8}{stats['rps']:>9.1f}"
+           f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}")
+    if baseline:
+        def delta(key):
+            before = baseline[key]
+            return f"{(stats[key] - before) / before * 100:+.0f}%" if before else "n/a"
+        row += f"   rps {delta('rps')}  p95 {delta('p95_ms')}  p99 {delta('p99_ms')}"
+    print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", type=parse_configs, default=parse_configs("1x4,1x16,4x4"),
+                        help="comma-separated WORKERSxTHREADS app configurations")
+    parser.add_argument("--server", choices=("builtin", "gunicorn"), default="builtin")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per configuration")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each run")
+    parser.add_argument("--concurrency", type=int, default=32, help="client threads")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("search=60,detail=30,shelf=10"),
+                        help="operation weights, e.g. search=60,detail=30,shelf=10")
+    parser.add_argument("--queries", type=int, default=200, help="distinct search queries (controls cache hit rate)")
+    parser.add_argument("--volumes", type=int, default=2000, help="distinct volume IDs for detail and shelf requests")
+    parser.add_argument("--json", metavar="PATH", help="write results to PATH")
+    parser.add_argument("--compare", metavar="PATH", help="show changes against results saved with --json")
+    fake_google_books.add_arguments(parser)
+    args = parser.parse_args()
+
+    fake = fake_google_books.from_arguments(args)
+    server = fake_google_books.start_server(fake)
+    upstream_url = f"http://127.0.0.1:{server.server_address[1]}{fake_google_books.BASE_PATH}"
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print(f"upstream: median {args.latency_ms:.0f}ms, sigma {args.latency_sigma}, error rate {args.error_rate:.1%}")
+    print(f"clients: {args.concurrency}, mix: {', '.join(f'{k}={v:g}' for k, v in args.mix.items())}, "
+          f"{args.duration:g}s per configuration")
+    print(f"{'config':<20}{'requests':>9}{'errors':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+
+    report = {}
+    for workers, threads in args.configs:
+        config = f"{workers}x{threads}"
+        upstream_before = fake.requests
+        result = run_config(args, workers, threads, upstream_url)
+        result["upstream_requests"] = fake.requests - upstream_before
+        report[config] = result
+        base = baseline.get(config)
+        print_row(config, result["total"], base and base["total"])
+        for name, stats in result["operations"].items():
+            print_row(f"  {name}", stats, base and base["operations"].get(name))
+        print(f"  {'upstream calls':<18}{result['upstream_requests']:>9}")
+
+    server.shutdown()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
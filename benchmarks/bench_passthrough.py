@@ -0,0 +1,76 @@
+"""CPU cost per proxied request: re-parse + jsonify vs raw passthrough.
+
+Runs the Flask app in-process against a stubbed upstream that returns a
+search page of ``--volumes`` full volumes, so only our own work is measured.
+
+    python benchmarks/bench_passthrough.py --requests 500 --volumes 40
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+# Don't let the upstream quota scheduler pace the stubbed calls
+os.environ.setdefault("UPSTREAM_RATE", "0")
+
+import requests  # noqa: E402
+from flask import jsonify  # noqa: E402
+
+import index  # noqa: E402
+from fake_google_books import make_volume  # noqa: E402
+
+
+def stub_upstream(payload):
+    def request(method, url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = payload
+        response.headers["Content-Type"] = "application/json; charset=UTF-8"
+        return response
+
+    index.upstream.request = request
+
+
+# The pre-passthrough handler: parse the upstream body and re-encode it
+@index.app.route("/bench/reparse")
+def reparse():
+    response = index.upstream_get(f"{index.VOLUMES_ENDPOINT}?q=bench")
+    return jsonify(response.json())
+
+
+def measure(client, path, count):
+    client.get(path)  # warm up
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for _ in range(count):
+        index.RESPONSE_CACHE.clear()
+        client.get(path)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    return cpu / count * 1e6, wall / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--volumes", type=int, default=40)
+    args = parser.parse_args()
+
+    payload = json.dumps({
+        "kind": "books#volumes",
+        "totalItems": 1000,
+        "items": [make_volume(i) for i in range(args.volumes)],
+    }).encode()
+    stub_upstream(payload)
+    client = index.app.test_client()
+
+    print(f"payload: {len(payload)} bytes, {args.volumes} volumes, json provider: {type(index.app.json).__name__}")
+    print(f"{'mode':<14}{'cpu us/req':>12}{'wall us/req':>13}")
+    for mode, path in (("reparse", "/bench/reparse"), ("passthrough", "/api/books/search?q=bench")):
+        cpu, wall = measure(client, path, args.requests)
+        print(f"{mode:<14}{cpu:>12.0f}{wall:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
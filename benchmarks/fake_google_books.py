@@ -0,0 +1,173 @@
+"""Local stand-in for the Google Books API, for load tests.
+
+Serves ``/books/v1/volumes`` (search), ``/books/v1/volumes/<id>`` (detail) and
+``/books/v1/users/<id>/bookshelves`` with synthetic volumes. Latency is drawn
+from a log-normal distribution, a fraction of requests fail with a 503, and
+the payload size is controlled by the description length.
+
+    python benchmarks/fake_google_books.py --port 8099 --latency-ms 80 --error-rate 0.01
+
+then start the app with ``GOOGLE_BOOKS_API_BASE_URL=http://127.0.0.1:8099/books/v1``.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BASE_PATH = "/books/v1"
+
+
+def make_volume(i, description_bytes=1120):
+    return {
+        "kind": "books#volume",
+        "id": f"vol{i:05d}",
+        "etag": "abcdefghijk",
+        "selfLink": f"https://www.googleapis.com/books/v1/volumes/vol{i:05d}",
+        "volumeInfo": {
+            "title": f"Benchmark Book {i}",
+            "subtitle": "A study in serialization",
+            "authors": ["Jane Doe", "John Roe"],
+            "publisher": "Example Press",
+            "publishedDate": "2020-01-01",
+            "description": ("Lorem ipsum dolor sit amet. " * (description_bytes // 28 + 1))[:description_bytes],
+            "industryIdentifiers": [{"type": "ISBN_13", "identifier": f"978000000{i:04d}"}],
+            "pageCount": 320,
+            "categories": ["Computers"],
+            "averageRating": 4.5,
+            "ratingsCount": 12,
+            "imageLinks": {
+                "smallThumbnail": "http://books.google.com/books/content?id=x&zoom=5",
+                "thumbnail": "http://books.google.com/books/content?id=x&zoom=1",
+            },
+            "language": "en",
+        },
+        "saleInfo": {"country": "US", "saleability": "NOT_FOR_SALE", "isEbook": False},
+        "accessInfo": {"country": "US", "viewability": "PARTIAL", "embeddable": True},
+        "searchInfo": {"textSnippet": "Lorem ipsum dolor sit amet."},
+    }
+
+
+class FakeGoogleBooks:
+    def __init__(self, latency_ms=50.0, latency_sigma=0.5, error_rate=0.0,
+                 description_bytes=1120, total_items=1000, catalog_size=5000):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.description_bytes = description_bytes
+        self.total_items = total_items
+        self.catalog_size = catalog_size
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def delay(self):
+        if self.latency_ms > 0:
+            # Log-normal with the configured median: most calls are quick, a few are slow
+            time.sleep(self.latency_ms / 1000 * math.exp(random.gauss(0, self.latency_sigma)))
+
+    def search(self, params):
+        query = params.get("q", [""])[0]
+        start = int(params.get("startIndex", ["0"])[0] or 0)
+        count = min(int(params.get("maxResults", ["10"])[0] or 10), 40)
+        # Each query maps to a stable slice of the catalog
+        offset = int(hashlib.md5(query.encode()).hexdigest(), 16) % self.catalog_size
+        count = max(0, min(count, self.total_items - start))
+        items = [
+            make_volume((offset + start + i) % self.catalog_size, self.description_bytes)
+            for i in range(count)
+        ]
+        return {"kind": "books#volumes", "totalItems": self.total_items, "items": items}
+
+    def volume(self, volume_id):
+        if not volume_id.startswith("vol") or not volume_id[3:].isdigit():
+            return None
+        return make_volume(int(volume_id[3:]), self.description_bytes)
+
+    def handle(self, path, params):
+        with self._lock:
+            self.requests += 1
+        self.delay()
+        if self.error_rate and random.random() < self.error_rate:
+            return 503, {"error": {"code": 503, "message": "Backend Error"}}
+        if not path.startswith(BASE_PATH):
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        path = path[len(BASE_PATH):]
+        if path == "/volumes":
+            return 200, self.search(params)
+        if path.startswith("/volumes/"):
+            volume = self.volume(path[len("/volumes/"):])
+            if volume is None:
+                return 404, {"error": {"code": 404, "message": "The volume ID could not be found."}}
+            return 200, volume
+        if path.startswith("/users/") and path.endswith("/bookshelves"):
+            return 200, {"kind": "books#bookshelves", "items": [
+                {"kind": "books#bookshelf", "id": 0, "title": "Favorites", "volumeCount": 0},
+            ]}
+        return 404, {"error": {"code": 404, "message": "Not Found"}}
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            status, body = fake.handle(url.path, parse_qs(url.query))
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(fake, host="127.0.0.1", port=0):
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="median upstream latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal spread of upstream latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls that return 503")
+    parser.add_argument("--description-bytes", type=int, default=1120, help="description length per volume")
+
+
+def from_arguments(args):
+    return FakeGoogleBooks(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        description_bytes=args.description_bytes,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = start_server(from_arguments(args), args.host, args.port)
+    print(f"fake Google Books API at http://{args.host}:{server.server_address[1]}{BASE_PATH}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
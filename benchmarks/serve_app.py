@@ -0,0 +1,82 @@
+"""Serve the Flask app with a fixed number of worker processes and threads.
+
+A stdlib/Werkzeug stand-in for ``gunicorn -w W --threads T`` so load tests run
+without extra dependencies: the listening socket is bound once, then forked
+into ``--workers`` processes that each handle requests on a pool of
+``--threads`` threads.
+
+    python benchmarks/serve_app.py --port 5328 --workers 2 --threads 8
+"""
+import argparse
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler  # noqa: E402
+
+
+# HTTP/1.0 (the Werkzeug default) closes each connection after one request, so
+# idle keep-alive clients can't pin every pool thread
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    def __init__(self, host, port, app, threads):
+        super().__init__(host, port, app, handler=QuietHandler)
+        self.socket.listen(1024)
+        self.threads = threads
+        self.executor = None
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def serve(self):
+        self.executor = ThreadPoolExecutor(self.threads)
+        self.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5328)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    # Import before forking, like gunicorn --preload, so workers share the loaded code
+    import index
+
+    server = PooledWSGIServer(args.host, args.port, index.app, args.threads)
+    children = []
+    for _ in range(args.workers - 1):
+        pid = os.fork()
+        if pid == 0:
+            server.serve()
+            os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    server.serve()
+
+
+if __name__ == "__main__":
+    main()
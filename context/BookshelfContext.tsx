@@ -16,10 +16,16 @@ interface BookshelfBook {
   volumeInfo: Book['volumeInfo']
 }
 
+export type ShelfOperation =
+  | { op: 'add'; shelfId: string; book: Book }
+  | { op: 'remove'; shelfId: string; bookId: string }
+  | { op: 'move'; fromShelfId: string; toShelfId: string; bookId: string }
+
 interface BookshelfContextType {
   bookshelves: Bookshelf[]
   addBookToShelf: (shelfId: string, book: Book) => Promise<boolean>
   removeBookFromShelf: (shelfId: string, bookId: string) => Promise<boolean>
+  applyShelfOperations: (operations: ShelfOperation[]) => Promise<boolean>
   getBooksInShelf: (shelfId: string) => Promise<BookshelfBook[]>
   isLoading: boolean
   error: string | null
@@ -142,6 +148,67 @@ export function BookshelfProvider({ children }: { children: ReactNode }) {
     }
   }
 
+  // Apply many adds, removes and moves in one request instead of one request
+  // (and one bookshelf refresh) per book
+  const applyShelfOperations = async (operations: ShelfOperation[]): Promise<boolean> => {
+    try {
+      let response
+      
+      if (isAuthenticated) {
+        // Google Books API for authenticated users, which works on volume IDs
+        const volumeOperations = operations.map((operation) => {
+          switch (operation.op) {
+            case 'add':
+              return { op: 'add', shelfId: operation.shelfId, volumeId: operation.book.id }
+            case 'remove':
+              return { op: 'remove', shelfId: operation.shelfId, volumeId: operation.bookId }
+            case 'move':
+              return { op: 'move', fromShelfId: operation.fromShelfId, toShelfId: operation.toShelfId, volumeId: operation.bookId }
+          }
+        })
+        
+        response = await fetch('/api/mylibrary/bookshelves/bulk', {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json'
+          },
+          body: JSON.stringify({ operations: volumeOperations })
+        })
+      } else {
+        // Local storage for non-authenticated users
+        const addedAt = new Date().toISOString()
+        const localOperations = operations.map((operation) =>
+          operation.op === 'add' ? { ...operation, book: { ...operation.book, addedAt } } : operation
+        )
+        
+        response = await fetch(`/api/bookshelves/bulk?user_id=${userId}`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json'
+          },
+          body: JSON.stringify({ operations: localOperations })
+        })
+      }
+      
+      const data = await response.json()
+      
+      if (!response.ok || data.error) {
+        throw new Error(data.error || 'Failed to update bookshelves')
+      }
+      
+      // The local endpoint returns the updated counts; Google's needs a refresh
+      if (data.bookshelves) {
+        setBookshelves(data.bookshelves)
+      } else {
+        await fetchBookshelves()
+      }
+      return data.results.every((result: { status: number }) => result.status < 400)
+    } catch (err) {
+      console.error('Error updating bookshelves:', err)
+      return false
+    }
+  }
+
   const getBooksInShelf = async (shelfId: string): Promise<BookshelfBook[]> => {
     try {
       let response
@@ -183,6 +250,7 @@ export function BookshelfProvider({ children }: { children: ReactNode }) {
       bookshelves,
       addBookToShelf,
       removeBookFromShelf,
+      applyShelfOperations,
       getBooksInShelf,
       isLoading,
       error